@@ -0,0 +1,20 @@
+"""Where the application keeps its per-user files.
+
+Kept apart from parse_cache and inventory so that finding the directory
+does not import either of them.
+"""
+import os
+import sys
+
+APP_DIR_NAME = "printer-cost-calculator"
+
+
+def config_dir():
+    """Per-user configuration directory of the application."""
+    if sys.platform == 'win32':
+        base = os.environ.get('APPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Application Support')
+    else:
+        base = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(base, APP_DIR_NAME)
@@ -0,0 +1,192 @@
+"""Cost a directory or glob of G-code files without the GUI.
+
+Usage:
+    python -m batch_cost JOBS_DIR --settings settings.json > costs.csv
+    python -m batch_cost "queue/*.gcode.3mf" --settings s.json --format jsonl
+
+The settings file is the JSON written by the desktop app's Save Settings.
+Parsed filament is charged per tool to the matching spool (T0 to the
+first spool, T1 to the second, ...) using that spool's material for the
+length-to-weight conversion and spool size, and the print time comes
+from the G-code when it has one, otherwise from the settings. Multi-plate
+projects get a row per plate plus a 'total' row.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import glob
+import json
+import os
+import sys
+
+import cost_engine
+import gcode_parser
+import materials
+import parse_cache
+
+GCODE_SUFFIXES = ('.gcode', '.gcode.3mf', '.3mf')
+COLUMNS = ['file', 'plate', 'print_hours', 'filament_grams', 'power_cost', 'filament_cost',
+           'total_cost', 'cost_per_item', 'error']
+
+
+class SettingsError(Exception):
+    """Raised when the settings file cannot be used for costing."""
+
+
+def load_settings(path):
+    """Read a Save Settings JSON file and convert its fields to numbers."""
+    try:
+        with open(path, 'r') as f:
+            settings = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SettingsError(f"Failed to load settings from {path}: {e}")
+    return settings_from_dict(settings)
+
+
+def settings_from_dict(settings):
+    """Convert Save Settings JSON, already decoded, to the numbers cost_result uses."""
+    try:
+        basic = settings['basic']
+        spools = [(float(spool['cost']), float(spool['used'])) for spool in settings['spools']]
+        # Settings saved before spools had a material are PLA
+        spool_materials = [materials.get_material(spool.get('material', materials.DEFAULT_MATERIAL))
+                           for spool in settings['spools']]
+        return {
+            'power_cost': float(basic['power_cost']),
+            'power_usage': float(basic['power_usage']),
+            'print_time': float(basic['print_time']),
+            'num_items': int(basic['num_items']),
+            'spools': spools or [(0.0, 0.0)],
+            'materials': spool_materials or [materials.get_material(materials.DEFAULT_MATERIAL)],
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        raise SettingsError(f"Invalid settings: {e}")
+
+
+def find_jobs(patterns, recursive=False):
+    """Expand directories and glob patterns into a sorted list of G-code files."""
+    jobs = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walker = os.walk(pattern) if recursive else [next(os.walk(pattern))]
+            for root, _, names in walker:
+                jobs.update(os.path.join(root, name) for name in names
+                            if name.lower().endswith(GCODE_SUFFIXES))
+        else:
+            jobs.update(path for path in glob.glob(pattern, recursive=recursive)
+                        if os.path.isfile(path))
+    return sorted(jobs)
+
+
+def cost_result(result, settings):
+    """Cost columns for one ParseResult (a file, or one plate of a project)."""
+    if result.time_seconds is not None:
+        print_hours = result.time_seconds / 3600
+    else:
+        print_hours = settings['print_time']
+    spool_materials = settings['materials']
+    factors = [material.mm_per_gram for material in spool_materials]
+    grams = result.grams(factors)
+
+    # Each tool's filament is charged at its own spool's price and weight
+    spools = []
+    for tool, tool_grams in enumerate(result.tool_grams(factors)):
+        slot = tool if tool < len(settings['spools']) else 0
+        spools.append((settings['spools'][slot][0], tool_grams, spool_materials[slot].spool_weight))
+    costs = cost_engine.job_cost(settings['power_cost'], settings['power_usage'],
+                                 print_hours, settings['num_items'], spools)
+    return {
+        'print_hours': round(print_hours, 4),
+        'filament_grams': round(grams, 2),
+        'power_cost': round(costs['power_cost'], 4),
+        'filament_cost': round(costs['filament_cost'], 4),
+        'total_cost': round(costs['total_cost'], 4),
+        'cost_per_item': round(costs['cost_per_item'], 4),
+    }
+
+
+def parse_job(file_path, use_cache=True):
+    """ParseResult of a file, through the parse cache unless use_cache is false.
+
+    cached_parse falls back to a plain parse when the cache is unusable.
+    """
+    if use_cache:
+        return parse_cache.cached_parse(file_path)
+    return gcode_parser.parse_file(file_path)
+
+
+def cost_job(file_path, settings, use_cache=True):
+    """Parse and cost one file; runs in a worker process.
+
+    Returns one row, or for multi-plate projects one row per plate followed
+    by the project total.
+    """
+    try:
+        result = parse_job(file_path, use_cache)
+    except Exception as e:
+        return [{'file': file_path, 'error': str(e) or type(e).__name__}]
+    return cost_rows(file_path, result, settings)
+
+
+def cost_rows(file_path, result, settings):
+    """Rows of cost_job for a file that is already parsed."""
+    rows = []
+    if len(result.plates) > 1:
+        for plate in result.plates:
+            rows.append({'file': file_path, 'plate': plate.name, **cost_result(plate, settings)})
+        rows.append({'file': file_path, 'plate': 'total', **cost_result(result, settings)})
+    else:
+        rows.append({'file': file_path, **cost_result(result, settings)})
+    return rows
+
+
+def write_rows(rows, out, fmt):
+    if fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+    for job_rows in rows:
+        for row in job_rows:
+            if fmt == 'csv':
+                writer.writerow(row)
+            else:
+                out.write(json.dumps(row) + "\n")
+        # Stream each file's rows as soon as they are known
+        out.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m batch_cost",
+                                     description="Cost G-code files in parallel without the GUI.")
+    parser.add_argument('paths', nargs='+', help="directories, files or glob patterns")
+    parser.add_argument('-s', '--settings', required=True, help="settings JSON saved by the app")
+    parser.add_argument('-f', '--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('-o', '--output', help="write rows here instead of stdout")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('-r', '--recursive', action='store_true', help="descend into subdirectories")
+    parser.add_argument('--no-cache', action='store_true', help="always reparse, skip the parse cache")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = load_settings(args.settings)
+    except SettingsError as e:
+        parser.error(str(e))
+
+    jobs = find_jobs(args.paths, args.recursive)
+    if not jobs:
+        parser.error("no .gcode or .gcode.3mf files found")
+
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        with ProcessPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+            rows = executor.map(cost_job, jobs, [settings] * len(jobs),
+                                [not args.no_cache] * len(jobs), chunksize=4)
+            write_rows(rows, out, args.format)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Motion-model print time estimates against slicer-reported times.
+
+Usage: python benchmarks/bench_motion.py [FILE ...] [--moves 1000000]
+
+For every file with a slicer time the estimate is printed next to it with
+the relative error. Without files, a synthetic toolpath whose exact time is
+known is timed with both the NumPy and the pure-Python planner; the exit
+code is non-zero when either misses the golden value.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import gcode_parser
+import motion_model
+
+# Every segment ends in a full reversal, so each takes d/v + v/a exactly
+SEGMENT = 100.0
+SPEED = 100.0
+ACCELERATION = 1250.0
+
+
+def synthetic_lines(moves):
+    yield b'M204 S1250'
+    yield b'G1 F6000'
+    for i in range(moves):
+        yield b'G1 X100 E0.1' if i % 2 == 0 else b'G1 X0 E0.2'
+
+
+def check_synthetic(moves):
+    golden = moves * (SEGMENT / SPEED + SPEED / ACCELERATION)
+    lines = list(synthetic_lines(moves))
+    failed = False
+    for vectorized in (True, False):
+        if vectorized and motion_model.np is None:
+            print("numpy      not installed, skipped")
+            continue
+        start = time.perf_counter()
+        seconds = motion_model.estimate_lines(lines, vectorized=vectorized)
+        elapsed = time.perf_counter() - start
+        ok = abs(seconds - golden) <= 1e-6 * golden
+        failed |= not ok
+        print(f"{'numpy' if vectorized else 'python':<10} {moves / elapsed:>10,.0f} moves/s "
+              f"estimate {seconds:.3f}s golden {golden:.3f}s {'ok' if ok else 'MISMATCH'}")
+    return 1 if failed else 0
+
+
+def compare_files(paths):
+    errors = []
+    for path in paths:
+        reported = gcode_parser.parse_file(path, estimate=False).time_seconds
+        start = time.perf_counter()
+        estimate = gcode_parser.estimate_time(path)
+        elapsed = time.perf_counter() - start
+        if reported:
+            error = (estimate - reported) / reported
+            errors.append(abs(error))
+            print(f"{path}: slicer {reported / 60:8.1f} min, estimate {estimate / 60:8.1f} min "
+                  f"({error:+.1%}) in {elapsed:.2f}s")
+        else:
+            print(f"{path}: no slicer time, estimate {estimate / 60:8.1f} min in {elapsed:.2f}s")
+    if errors:
+        print(f"mean absolute error {sum(errors) / len(errors):.1%} over {len(errors)} files")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', help="sliced .gcode or .gcode.3mf files")
+    parser.add_argument('--moves', type=int, default=1_000_000, help="moves in the synthetic toolpath")
+    args = parser.parse_args()
+    if args.files:
+        return compare_files(args.files)
+    return check_synthetic(args.moves)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
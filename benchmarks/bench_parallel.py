@@ -0,0 +1,51 @@
+"""Serial versus process-pool parsing of one large plain .gcode file.
+
+Usage: python benchmarks/bench_parallel.py [--lines 30000000] [--workers N] [--file PATH]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import gcode_parser
+from synthetic import write_synthetic_gcode
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=30_000_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--file', help="benchmark an existing .gcode file instead")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = args.file
+        if file_path is None:
+            file_path = os.path.join(tmp, 'synthetic.gcode')
+            write_synthetic_gcode(file_path, args.lines)
+        size_mb = os.path.getsize(file_path) / 1e6
+        print(f"{file_path}: {size_mb:.1f} MB, {args.workers} workers")
+
+        serial, serial_time = timed(gcode_parser.parse_file, file_path)
+        print(f"serial     {serial_time:8.2f}s {size_mb / serial_time:8.1f} MB/s")
+        parallel, parallel_time = timed(gcode_parser.parse_file_parallel, file_path, args.workers)
+        print(f"parallel   {parallel_time:8.2f}s {size_mb / parallel_time:8.1f} MB/s "
+              f"speedup {serial_time / parallel_time:.2f}x")
+
+        if parallel.total_extrusion != serial.total_extrusion:
+            print(f"extrusion mismatch: {serial.total_extrusion} != {parallel.total_extrusion}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Golden-value checks and throughput of the G-code parser on every file flavour.
+
+Usage: python benchmarks/bench_parser.py [--lines 200000] [--case NAME ...] [--json PATH]
+                                         [--repeat 3] [--baseline PATH] [--max-slowdown 1.15] [--max-peak-mb 64]
+
+Each case writes a synthetic file (see synthetic.py) whose extrusion, move
+counts, layer and feature buckets and slicer totals are known exactly while
+it is generated: absolute or relative E, G92 resets, M73 progress, layer and
+;TYPE: comments, Prusa/Cura/Orca summary comments, plain or wrapped in a
+.gcode.3mf. The full scan and parse_file are checked against those values,
+and the scan's throughput (MB/s, lines/s) and tracemalloc peak are reported,
+timing the best of --repeat scans. --json saves the measurements; --baseline
+compares against a saved run and fails when a case got slower by more than
+--max-slowdown. The exit code is non-zero on any failure, so the script can
+gate CI and prove that a parser optimization is both safe and faster.
+tests/test_parser_golden.py runs the same golden checks under pytest.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import gcode_parser
+from synthetic import write_flavored_gcode, write_gcode_3mf
+
+# Default limit, shared with tests/test_parser_golden.py
+MAX_PEAK_MB = 64.0
+
+# name: (container, write_flavored_gcode options)
+CASES = {
+    'plain-absolute': ('gcode', {'header': 'none', 'e_mode': 'absolute'}),
+    'plain-relative': ('gcode', {'header': 'none', 'e_mode': 'relative'}),
+    'plain-no-m73': ('gcode', {'header': 'none', 'm73': False}),
+    'prusa': ('gcode', {'header': 'prusa', 'e_mode': 'absolute'}),
+    'cura-2-tools': ('gcode', {'header': 'cura', 'e_mode': 'absolute', 'tools': 2}),
+    'orca-2-tools': ('gcode', {'header': 'orca', 'e_mode': 'relative', 'tools': 2}),
+    '3mf-plain': ('3mf', {'header': 'none', 'e_mode': 'relative'}),
+    '3mf-orca': ('3mf', {'header': 'orca', 'e_mode': 'relative', 'tools': 2}),
+}
+
+
+def streams(golden):
+    """(3MF member or None, golden values) of every G-code stream in a case."""
+    if 'plates' in golden:
+        return [(plate['member'], plate) for plate in golden['plates']]
+    return [(None, golden)]
+
+
+def scan_all(file_path, golden):
+    return [gcode_parser.scan_file(file_path, member=member) for member, _ in streams(golden)]
+
+
+def check(errors, label, actual, expected):
+    if actual != expected:
+        errors.append(f"{label}: got {actual!r}, expected {expected!r}")
+
+
+def write_case(directory, name, lines):
+    """Write the synthetic file of a case; returns (path, golden values)."""
+    container, options = CASES[name]
+    if container == '3mf':
+        file_path = os.path.join(directory, name + '.gcode.3mf')
+        return file_path, write_gcode_3mf(file_path, lines, **options)
+    file_path = os.path.join(directory, name + '.gcode')
+    return file_path, write_flavored_gcode(file_path, lines, **options)
+
+
+def check_case(file_path, golden, scans=None):
+    """Differences between the parser's results and the golden values, as messages."""
+    errors = []
+    if scans is None:
+        scans = scan_all(file_path, golden)
+    for result, (member, expected) in zip(scans, streams(golden)):
+        label = member or "scan"
+        check(errors, f"{label} total_extrusion", result.total_extrusion, expected['extrusion'])
+        check(errors, f"{label} tool_extrusion", result.tool_extrusion, expected['tool_extrusion'])
+        check(errors, f"{label} total_lines", result.total_lines, expected['lines'])
+        check(errors, f"{label} total_moves", result.total_moves, expected['moves'])
+        check(errors, f"{label} g1_lines", result.g1_lines, expected['g1_lines'])
+        check(errors, f"{label} time_seconds", result.time_seconds, expected['scan_time'])
+        check(errors, f"{label} layer_extrusion", result.layer_extrusion, expected['layer_extrusion'])
+        check(errors, f"{label} feature_extrusion", result.feature_extrusion, expected['feature_extrusion'])
+
+    result = gcode_parser.parse_file(file_path, estimate=False)
+    for field in ('time_seconds', 'filament_mm', 'filament_g', 'from_metadata'):
+        check(errors, f"parse_file {field}", getattr(result, field), golden[field])
+    return errors
+
+
+def peak_memory(file_path, golden):
+    """tracemalloc peak of a scan, in bytes."""
+    # Traced separately: tracemalloc slows the scan down several times
+    tracemalloc.start()
+    try:
+        scan_all(file_path, golden)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(file_path, golden, repeat=3):
+    """Check one case against its golden values and measure the scan."""
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scans = scan_all(file_path, golden)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    errors = check_case(file_path, golden, scans)
+
+    peak = peak_memory(file_path, golden)
+
+    return {
+        'seconds': elapsed,
+        'mb_per_s': golden['size'] / 1e6 / elapsed,
+        'lines_per_s': golden['lines'] / elapsed,
+        'peak_mb': peak / 1e6,
+        'size_mb': golden['size'] / 1e6,
+    }, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200_000, help="lines per file (per plate for 3MF)")
+    parser.add_argument('--case', action='append', choices=list(CASES), help="run only these cases")
+    parser.add_argument('--repeat', type=int, default=3, help="time the best of this many scans (default 3)")
+    parser.add_argument('--json', help="write the measurements to this file")
+    parser.add_argument('--baseline', help="measurements saved by an earlier --json run")
+    parser.add_argument('--max-slowdown', type=float, default=1.15,
+                        help="fail when a case is this many times slower than the baseline (default 1.15)")
+    parser.add_argument('--max-peak-mb', type=float, default=MAX_PEAK_MB,
+                        help="fail when the scan's traced peak exceeds this (default 64)")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['cases']
+
+    failed = False
+    measurements = {}
+    print(f"{'case':<16} {'MB':>7} {'MB/s':>8} {'lines/s':>12} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.case or CASES:
+            file_path, golden = write_case(tmp, name, args.lines)
+            stats, errors = run_case(file_path, golden, args.repeat)
+            measurements[name] = stats
+            os.remove(file_path)
+            line = (f"{name:<16} {stats['size_mb']:7.1f} {stats['mb_per_s']:8.1f} "
+                    f"{stats['lines_per_s']:12,.0f} {stats['peak_mb']:8.2f}")
+            if name in baseline:
+                line += f"  {stats['lines_per_s'] / baseline[name]['lines_per_s']:.2f}x vs baseline"
+            print(line)
+
+            for error in errors:
+                print(f"  FAIL: {error}")
+            failed = failed or bool(errors)
+            if stats['peak_mb'] > args.max_peak_mb:
+                print(f"  FAIL: peak memory over {args.max_peak_mb:.0f} MB")
+                failed = True
+            # Compare rates, so runs with a different --lines still line up
+            if name in baseline and baseline[name]['lines_per_s'] > stats['lines_per_s'] * args.max_slowdown:
+                print(f"  FAIL: slower than the baseline ({baseline[name]['lines_per_s']:,.0f} lines/s)")
+                failed = True
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'lines': args.lines, 'cases': measurements}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""Startup cost of the desktop app: import time and time to first paint.
+
+Usage: python benchmarks/bench_startup.py [--max-import-ms 100] [--max-import-ratio 2] [--max-paint-ms 1000]
+
+The app's own imports (everything at the top of print_cost_calculator.py
+except Tk and ttkbootstrap) are timed with python -X importtime, and the
+parser, the parse cache, json, zipfile and NumPy must not be among them.
+Besides the absolute limit, the imports may take at most --max-import-ratio
+times as long as the standard library modules among them alone, measured
+the same way, which holds on slow and fast machines alike. When ttkbootstrap and a
+display are available, the window is also opened in a fresh interpreter to
+time the first paint and the build of the remaining widgets. The exit code
+is non-zero when a threshold is exceeded. tests/test_startup.py runs the
+same checks under pytest.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+APP = os.path.join(ROOT, 'print_cost_calculator.py')
+
+GUI_MODULES = ('ttkbootstrap', 'tkinter')
+# Default limits, shared with tests/test_startup.py
+MAX_IMPORT_MS = 100.0
+MAX_IMPORT_RATIO = 2.0
+MAX_PAINT_MS = 1000.0
+# Loaded on demand by the app; importing any of them at startup is a regression
+DEFERRED_MODULES = ('gcode_parser', 'gcode_3mf', 'motion_model', 'parse_cache', 'json', 'zipfile', 'numpy',
+                    'mmap', 'concurrent.futures', 'multiprocessing')
+
+PAINT_SCRIPT = """
+import json, sys, time
+import print_cost_calculator as app
+times = {'imported': time.time()}
+root = app.ttk.Window(themename="darkly")
+calculator = app.PrintCostCalculator(root)
+
+def painted():
+    times.setdefault('first_paint', time.time())
+
+def check_ready():
+    if calculator.widgets_ready:
+        times['ready'] = time.time()
+        print(json.dumps(times))
+        root.destroy()
+    else:
+        root.after(5, check_ready)
+
+root.bind("<Map>", lambda event: root.after_idle(painted) if event.widget is root else None, add="+")
+root.after(5, check_ready)
+root.mainloop()
+"""
+
+
+def app_imports():
+    """Top-level modules imported by the app, without the GUI toolkit."""
+    with open(APP) as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        modules.extend(name for name in names if name.split('.')[0] not in GUI_MODULES)
+    return modules
+
+
+def stdlib_imports(modules):
+    """The modules that are not part of this repository."""
+    return [name for name in modules if not os.path.exists(os.path.join(ROOT, name.split('.')[0] + '.py'))]
+
+
+def import_ratio(modules):
+    """Time of the app's imports over that of its standard library imports alone."""
+    return import_profile(modules)[0] / import_profile(stdlib_imports(modules))[0]
+
+
+def import_profile(modules):
+    """(total ms, {module: cumulative ms}) from python -X importtime."""
+    code = "import " + ", ".join(modules)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    cumulative = {}
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total_us, name = line.split(':', 1)[1].split('|')
+        cumulative[name.strip()] = int(total_us) / 1000
+        # Modules imported directly by the statement are indented by one space
+        if not name[1:].startswith(' '):
+            total += int(total_us) / 1000
+    return total, cumulative
+
+
+def first_paint():
+    """Seconds from launch to the first paint and to the fully built window, or None."""
+    start = time.time()
+    proc = subprocess.run([sys.executable, '-c', PAINT_SCRIPT], cwd=ROOT, capture_output=True,
+                          text=True, timeout=60)
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+    times = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {key: value - start for key, value in times.items()}, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-import-ms', type=float, default=MAX_IMPORT_MS,
+                        help=f"limit for the app's own imports (default {MAX_IMPORT_MS:.0f})")
+    parser.add_argument('--max-import-ratio', type=float, default=MAX_IMPORT_RATIO,
+                        help=f"limit relative to the standard library imports alone (default {MAX_IMPORT_RATIO:g})")
+    parser.add_argument('--max-paint-ms', type=float, default=MAX_PAINT_MS,
+                        help=f"limit from launch to the first paint (default {MAX_PAINT_MS:.0f})")
+    args = parser.parse_args()
+    failed = False
+
+    modules = app_imports()
+    total, cumulative = import_profile(modules)
+    print(f"app imports ({', '.join(modules)}): {total:.1f} ms (limit {args.max_import_ms:.0f} ms)")
+    for name, ms in sorted(cumulative.items(), key=lambda item: -item[1])[:8]:
+        print(f"  {ms:8.1f} ms  {name}")
+    if total > args.max_import_ms:
+        print("FAIL: app imports over the limit")
+        failed = True
+    ratio = total / import_profile(stdlib_imports(modules))[0]
+    print(f"  {ratio:.2f}x the standard library imports alone (limit {args.max_import_ratio:g}x)")
+    if ratio > args.max_import_ratio:
+        print("FAIL: the app's modules add too much to the imports")
+        failed = True
+    loaded = [name for name in DEFERRED_MODULES if name in cumulative]
+    if loaded:
+        print(f"FAIL: imported at startup: {', '.join(loaded)}")
+        failed = True
+
+    times, error = first_paint()
+    if times is None:
+        print(f"first paint skipped ({error})")
+    else:
+        paint_ms = times.get('first_paint', times['ready']) * 1000
+        print(f"imports done {times['imported'] * 1000:8.1f} ms")
+        print(f"first paint  {paint_ms:8.1f} ms (limit {args.max_paint_ms:.0f} ms)")
+        print(f"all widgets  {times['ready'] * 1000:8.1f} ms")
+        if paint_ms > args.max_paint_ms:
+            print("FAIL: first paint over the limit")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
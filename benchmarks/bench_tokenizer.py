@@ -0,0 +1,124 @@
+"""Lines/sec of the original per-line regex loop versus the prefix tokenizer.
+
+Usage: python benchmarks/bench_tokenizer.py [--lines 10000000] [--file PATH]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import gcode_parser
+from synthetic import write_synthetic_gcode
+
+
+def legacy_parse(file_path):
+    """The scanning loop load_gcode used before the tokenizer, kept as the baseline."""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError:
+        text = raw.decode('latin-1')
+
+    gcode_time_seconds = None
+    gcode_filament_mm = None
+    absolute_e = True
+    current_e = 0.0
+    total_extrusion = 0.0
+    total_lines = 0
+
+    for line in text.splitlines():
+        total_lines += 1
+        try:
+            line = line.strip()
+            if not line or line.startswith(';'):
+                continue
+
+            if gcode_time_seconds is None:
+                time_patterns = [
+                    (r';TIME:(\d+)', 1),
+                    (r';Print time: (\d+)', 1),
+                    (r';Estimated printing time: .* (\d+)s', 1),
+                    (r'M73 P\d+ R(\d+)', 60),
+                    (r';TIME_ELAPSED:(\d+\.?\d*)', 1),
+                    (r'; estimated printing time = .* = (\d+)s', 1)
+                ]
+                for pattern, multiplier in time_patterns:
+                    time_match = re.search(pattern, line, re.IGNORECASE)
+                    if time_match:
+                        gcode_time_seconds = float(time_match.group(1)) * multiplier
+                        break
+
+            fil_match = re.search(r';Filament used:\s*([\d.]+)\s*mm', line, re.IGNORECASE)
+            if fil_match:
+                gcode_filament_mm = float(fil_match.group(1))
+                continue
+
+            if 'M83' in line:
+                absolute_e = False
+                continue
+            elif 'M82' in line:
+                absolute_e = True
+                continue
+
+            if 'G1' in line:
+                e_match = re.search(r'(?:^|[^0-9.])[Gg]1.*[Ee]([-+]?\d*\.?\d+)', line)
+                if e_match:
+                    new_e = float(e_match.group(1))
+                    extrusion = new_e - current_e if absolute_e else new_e
+                    if extrusion > 0:
+                        total_extrusion += extrusion
+                    current_e = new_e if absolute_e else current_e + new_e
+                    continue
+
+            if re.search(r'[Gg]92.*[Ee].*0', line):
+                current_e = 0.0
+
+        except (ValueError, IndexError):
+            continue
+
+    return gcode_time_seconds, gcode_filament_mm or total_extrusion, total_lines
+
+
+def run(label, func, file_path):
+    start = time.perf_counter()
+    time_seconds, filament_mm, lines = func(file_path)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed:8.2f}s {lines / elapsed:14,.0f} lines/s  "
+          f"time={time_seconds} filament={filament_mm:.3f}mm")
+    return filament_mm
+
+
+def tokenizer_parse(file_path):
+    result = gcode_parser.parse_file(file_path)
+    return result.time_seconds, result.filament_mm, result.total_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=10_000_000)
+    parser.add_argument('--file', help="benchmark an existing .gcode file instead")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = args.file
+        if file_path is None:
+            file_path = os.path.join(tmp, 'synthetic.gcode')
+            write_synthetic_gcode(file_path, args.lines)
+        size_mb = os.path.getsize(file_path) / 1e6
+        print(f"{file_path}: {size_mb:.1f} MB")
+
+        before = run("legacy", legacy_parse, file_path)
+        after = run("tokenizer", tokenizer_parse, file_path)
+        if abs(before - after) > 1e-6 * max(before, 1.0):
+            print(f"extrusion mismatch: {before} != {after}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
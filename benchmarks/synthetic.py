@@ -0,0 +1,270 @@
+"""Synthetic G-code generators for the parser benchmarks."""
+import os
+import random
+import shutil
+import zipfile
+
+
+def iter_synthetic_lines(num_lines, seed=1):
+    """Yield num_lines lines of slicer-like G-code in absolute E mode."""
+    rng = random.Random(seed)
+    yield "; generated by benchmarks/synthetic.py"
+    yield "M82"
+    yield "G92 E0"
+    yield "M73 P0 R120"
+    e = 0.0
+    emitted = 4
+    while emitted < num_lines:
+        if emitted % 5000 == 0:
+            yield "G92 E0"
+            e = 0.0
+        elif emitted % 1000 == 0:
+            yield ";TYPE:Solid infill"
+        elif emitted % 7 == 0:
+            yield f"G1 X{rng.uniform(0, 200):.3f} Y{rng.uniform(0, 200):.3f} F9000"
+        else:
+            e += rng.uniform(0.0, 0.2)
+            yield f"G1 X{rng.uniform(0, 200):.3f} Y{rng.uniform(0, 200):.3f} E{e:.5f}"
+        emitted += 1
+
+
+def write_lines(f, lines, batch_size=10000):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == batch_size:
+            f.write("\n".join(batch) + "\n")
+            batch = []
+    if batch:
+        f.write("\n".join(batch) + "\n")
+
+
+def write_synthetic_gcode(path, num_lines, seed=1):
+    with open(path, 'w') as f:
+        write_lines(f, iter_synthetic_lines(num_lines, seed))
+
+
+# Flavoured files with golden values. E positions are generated as integers
+# in 1/E_UNITS mm and written with five decimals, so the expected totals
+# are exact and do not depend on the parser under test.
+E_UNITS = 100000
+HEADERS = ('none', 'prusa', 'cura', 'orca')
+LAYER_MARKERS = {
+    'none': ";LAYER_CHANGE",
+    'prusa': ";LAYER_CHANGE",
+    'cura': ";LAYER:{layer}",
+    'orca': "; CHANGE_LAYER",
+}
+FEATURES = ("Perimeter", "External perimeter", "Solid infill", "Internal infill", "Support material")
+
+
+def e_text(units):
+    """E value in mm with five decimals, formatted from integer units."""
+    sign = "-" if units < 0 else ""
+    units = abs(units)
+    return f"{sign}{units // E_UNITS}.{units % E_UNITS:05d}"
+
+
+def format_duration(seconds):
+    """Slicer-style duration such as '1d 2h 3m 4s'."""
+    seconds = int(seconds)
+    parts = []
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size or parts:
+            parts.append(f"{seconds // size}{unit}")
+            seconds %= size
+    parts.append(f"{seconds}s")
+    return " ".join(parts)
+
+
+def iter_flavored_body(num_lines, golden, header='none', e_mode='absolute', m73=True, tools=1,
+                       g92_every=5000, seed=1):
+    """Yield the moves of a print and count what a parser should find in golden."""
+    rng = random.Random(seed)
+    absolute = e_mode == 'absolute'
+    # The print time every M73 counts down from, in whole minutes
+    minutes = 1 + num_lines // 1500
+    tool_units = [0] * tools
+    tool = 0
+    position = 0
+    retracted = False
+    layer = 0
+    # Extrusion units per layer (0: before the first marker) and per feature
+    layer_units = [0]
+    feature = ''
+    feature_units = {}
+
+    yield "M82" if absolute else "M83"
+    yield "G92 E0"
+    emitted = 2
+    while emitted < num_lines:
+        if m73 and emitted % 10000 == 2:
+            done = emitted * 100 // num_lines
+            if golden['scan_time'] is None:
+                golden['scan_time'] = minutes * 60.0
+            yield f"M73 P{done} R{minutes - minutes * done // 100}"
+        elif emitted % 2000 == 3:
+            layer += 1
+            layer_units.append(0)
+            yield LAYER_MARKERS[header].format(layer=layer)
+            if header == 'cura':
+                emitted += 1
+                yield f";TIME_ELAPSED:{layer * 12.5:.1f}"
+            emitted += 1
+            golden['g1_lines'] += 1
+            yield f"G1 Z{layer * 0.2:.2f} F600"
+        elif emitted % 500 == 4:
+            feature = FEATURES[emitted // 500 % len(FEATURES)]
+            yield f";TYPE:{feature}"
+        elif emitted % g92_every == 5:
+            yield "G92 E0"
+            position = 0
+        elif tools > 1 and emitted % 3000 == 6:
+            tool = (tool + 1) % tools
+            yield f"T{tool}"
+        elif emitted % 50 == 7 or retracted:
+            # Retract, then prime by the same length on the next move
+            delta = 80000 if retracted else -80000
+            retracted = not retracted
+            golden['moves'] += 1
+            golden['g1_lines'] += 1
+            if delta > 0:
+                tool_units[tool] += delta
+                layer_units[-1] += delta
+                feature_units[feature] = feature_units.get(feature, 0) + delta
+            position += delta
+            yield f"G1 E{e_text(position if absolute else delta)} F2100"
+        elif emitted % 7 == 0:
+            yield f"G0 X{rng.uniform(0, 200):.3f} Y{rng.uniform(0, 200):.3f} F9000"
+        else:
+            delta = rng.randint(0, 20000)
+            golden['moves'] += 1
+            golden['g1_lines'] += 1
+            tool_units[tool] += delta
+            layer_units[-1] += delta
+            if delta:
+                feature_units[feature] = feature_units.get(feature, 0) + delta
+            position += delta
+            yield (f"G1 X{rng.uniform(0, 200):.3f} Y{rng.uniform(0, 200):.3f} "
+                   f"E{e_text(position if absolute else delta)}")
+        emitted += 1
+
+    golden['layers'] = layer
+    golden['tool_extrusion'] = [units / E_UNITS for units in tool_units]
+    golden['extrusion'] = sum(tool_units) / E_UNITS
+    golden['layer_extrusion'] = [units / E_UNITS for units in layer_units]
+    golden['feature_extrusion'] = {name: units / E_UNITS for name, units in feature_units.items()}
+    golden['slicer_time'] = minutes * 60 - 17
+
+
+def slicer_header(header, golden, mm_per_gram):
+    """(head lines, tail lines) of a slicer's summary comments, and fill golden."""
+    tool_mm = golden['tool_extrusion']
+    seconds = golden['slicer_time']
+    duration = format_duration(seconds)
+    tool_g = [float(f"{mm / mm_per_gram:.2f}") for mm in tool_mm]
+    listed_mm = ", ".join(f"{mm:.2f}" for mm in tool_mm)
+    listed_g = ", ".join(f"{g:.2f}" for g in tool_g)
+    total_g = f"{sum(tool_g):.2f}"
+
+    if header == 'prusa':
+        golden.update(time_seconds=float(seconds), filament_g=float(total_g),
+                      filament_mm=sum(float(f"{mm:.2f}") for mm in tool_mm))
+        head = ["; generated by PrusaSlicer 2.7.1+linux-x64-GTK3 on 2024-01-01 at 12:00:00 UTC", ""]
+        tail = ["; filament used [mm] = " + listed_mm,
+                "; filament used [cm3] = " + ", ".join(f"{mm * 0.0024:.2f}" for mm in tool_mm),
+                "; filament used [g] = " + listed_g,
+                "; filament cost = " + ", ".join("0.00" for _ in tool_mm),
+                "; total filament used [g] = " + total_g,
+                "; estimated printing time (normal mode) = " + duration]
+        return head, tail
+
+    if header == 'cura':
+        meters = [f"{mm / 1000:.5f}" for mm in tool_mm]
+        golden.update(time_seconds=float(seconds), filament_g=None,
+                      filament_mm=sum(float(m) * 1000.0 for m in meters))
+        head = [";FLAVOR:Marlin",
+                f";TIME:{seconds}",
+                ";Filament used: " + ", ".join(m + "m" for m in meters),
+                ";Layer height: 0.2",
+                f";LAYER_COUNT:{golden['layers']}",
+                ";Generated with Cura_SteamEngine 5.6.0"]
+        return head, [";End of Gcode"]
+
+    if header == 'orca':
+        golden.update(time_seconds=float(seconds), filament_g=float(total_g),
+                      filament_mm=sum(float(f"{mm:.2f}") for mm in tool_mm))
+        head = ["; HEADER_BLOCK_START",
+                "; generated by OrcaSlicer 2.1.1 on 2024-01-01 at 12:00:00",
+                f"; model printing time: {format_duration(seconds - 60)}; total estimated time: {duration}",
+                f"; total layer number: {golden['layers']}",
+                "; HEADER_BLOCK_END"]
+        tail = ["; filament used [mm] = " + listed_mm,
+                "; filament used [g] = " + listed_g,
+                "; total filament weight [g] : " + total_g]
+        return head, tail
+
+    # No summary: the parser has to scan, and only M73 can give a time
+    golden.update(time_seconds=golden['scan_time'], filament_g=None, filament_mm=golden['extrusion'])
+    return ["; generated by benchmarks/synthetic.py"], []
+
+
+def write_flavored_gcode(path, num_lines, header='none', e_mode='absolute', m73=True, tools=1,
+                         g92_every=5000, seed=1, mm_per_gram=335.0):
+    """Write about num_lines of G-code in a slicer's style and return its golden values.
+
+    header is one of HEADERS; slicers that write their summary at the head
+    of the file need the body first, so it goes through a temporary file.
+    The golden dict holds what a full scan finds (lines, moves, g1_lines,
+    extrusion, tool_extrusion, scan_time) and what parse_file(estimate=False)
+    reports (time_seconds, filament_mm, filament_g, from_metadata).
+    """
+    golden = {'moves': 0, 'g1_lines': 0, 'scan_time': None}
+    body_path = path + '.body'
+    with open(body_path, 'w') as f:
+        write_lines(f, iter_flavored_body(num_lines, golden, header, e_mode, m73, tools, g92_every, seed))
+    head, tail = slicer_header(header, golden, mm_per_gram)
+    golden['from_metadata'] = header != 'none'
+
+    with open(path, 'wb') as out:
+        out.write(("\n".join(head) + "\n").encode())
+        with open(body_path, 'rb') as body:
+            shutil.copyfileobj(body, out, 1 << 20)
+        if tail:
+            out.write(("\n".join(tail) + "\n").encode())
+    os.remove(body_path)
+
+    with open(path, 'rb') as f:
+        golden['lines'] = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+    golden['size'] = os.path.getsize(path)
+    return golden
+
+
+def write_gcode_3mf(path, num_lines, plates=2, **kwargs):
+    """Write a .gcode.3mf with one flavoured member per plate and no slice_info.
+
+    Returns the project golden values with the per-plate ones under 'plates'.
+    """
+    seed = kwargs.pop('seed', 1)
+    members = []
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for index in range(1, plates + 1):
+            member_path = f"{path}.plate_{index}.gcode"
+            golden = write_flavored_gcode(member_path, num_lines, seed=seed + index, **kwargs)
+            golden['member'] = f"Metadata/plate_{index}.gcode"
+            archive.write(member_path, golden['member'])
+            os.remove(member_path)
+            members.append(golden)
+
+    times = [plate['time_seconds'] for plate in members if plate['time_seconds'] is not None]
+    grams = [plate['filament_g'] for plate in members]
+    return {
+        'plates': members,
+        'lines': sum(plate['lines'] for plate in members),
+        'size': sum(plate['size'] for plate in members),
+        'time_seconds': sum(times) if times else None,
+        'filament_mm': sum(plate['filament_mm'] for plate in members),
+        'filament_g': sum(grams) if None not in grams else None,
+        'from_metadata': all(plate['from_metadata'] for plate in members),
+    }
+
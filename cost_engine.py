@@ -0,0 +1,229 @@
+"""Cost math shared by the desktop app and the batch tools.
+
+Nothing here touches Tk, so it can run in worker processes. Every formula
+is plain arithmetic, so the same functions accept floats or NumPy arrays;
+arrays broadcast against each other and cost many scenarios in one call.
+
+NumPy is optional and only imported by the vectorized sweep, so the
+desktop app can use the cost model without paying for it at startup.
+
+Usage of the what-if sweep:
+    python -m cost_engine --rates 0.10,0.15,0.30 --spool-prices 18,25 \\
+        --batch-sizes 1,4,10 --job 4.5:75 --job 12:210
+    python -m cost_engine --jobs costs.csv --rates 0.12,0.2 --spool-prices 20
+"""
+import csv
+import itertools
+import sys
+
+
+def load_numpy():
+    """The numpy module, imported on first use, or None when it is not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def power_cost(power_usage, print_time, rate):
+    """Electricity cost of a print: watts / 1000 x hours x $/kWh."""
+    return (power_usage / 1000) * print_time * rate
+
+
+def filament_cost(used, spool_cost, spool_weight=1000.0):
+    """Cost of the grams used from a spool of spool_weight net grams."""
+    return used * (spool_cost / spool_weight)
+
+
+def job_cost(rate, power_usage, print_time, num_items, spools):
+    """Cost breakdown of one print, or of many when given arrays.
+
+    spools is a sequence of (spool_cost, used_grams) or (spool_cost,
+    used_grams, spool_weight) tuples; spool_weight defaults to 1 kg. Any
+    argument may be a NumPy array; the results then have the broadcast shape.
+    """
+    power = power_cost(power_usage, print_time, rate)
+    spool_costs = [filament_cost(used, cost, *weight) for cost, used, *weight in spools]
+    filament = sum(spool_costs)
+    total = power + filament
+    return {
+        'power_cost': power,
+        'filament_cost': filament,
+        'spool_costs': spool_costs,
+        'total_cost': total,
+        'cost_per_item': total / num_items,
+    }
+
+
+class CostModel:
+    """job_cost with every term cached, for live recalculation.
+
+    Inputs are changed one at a time; only the terms that depend on a
+    changed input are recomputed by the next totals() call. Spools are
+    keyed by any hashable id and reported in the order they were added.
+    """
+
+    def __init__(self, rate=0.0, power_usage=0.0, print_time=0.0, num_items=1):
+        self.inputs = {'rate': rate, 'power_usage': power_usage,
+                       'print_time': print_time, 'num_items': num_items}
+        self.spools = {}
+        self.spool_costs = {}
+        self.power = 0.0
+        self.filament = 0.0
+        self.dirty = {'power', 'filament'}
+
+    def set_input(self, name, value):
+        """Set 'rate', 'power_usage', 'print_time' or 'num_items'."""
+        if self.inputs[name] == value:
+            return
+        self.inputs[name] = value
+        if name != 'num_items':
+            self.dirty.add('power')
+
+    def set_spool(self, key, spool_cost, used, spool_weight=1000.0):
+        spool = (spool_cost, used, spool_weight)
+        if self.spools.get(key) == spool:
+            return
+        self.spools[key] = spool
+        self.spool_costs[key] = filament_cost(used, spool_cost, spool_weight)
+        self.dirty.add('filament')
+
+    def remove_spool(self, key):
+        if self.spools.pop(key, None) is not None:
+            del self.spool_costs[key]
+            self.dirty.add('filament')
+
+    def totals(self):
+        """The job_cost dict, with spool_costs keyed like the spools."""
+        if 'power' in self.dirty:
+            self.power = power_cost(self.inputs['power_usage'], self.inputs['print_time'], self.inputs['rate'])
+        if 'filament' in self.dirty:
+            self.filament = sum(self.spool_costs.values())
+        self.dirty.clear()
+        total = self.power + self.filament
+        return {
+            'power_cost': self.power,
+            'filament_cost': self.filament,
+            'spool_costs': self.spool_costs,
+            'total_cost': total,
+            'cost_per_item': total / self.inputs['num_items'],
+        }
+
+
+def sweep(jobs, rates, spool_prices, batch_sizes, power_usage):
+    """Cost every job under every tariff, spool price and batch size.
+
+    jobs is a sequence of (print_hours, filament_grams). Returns the
+    job_cost dict with arrays shaped (jobs, rates, spool_prices,
+    batch_sizes), computed in a single vectorized call. Needs NumPy.
+    """
+    np = load_numpy()
+    if np is None:
+        raise ImportError("NumPy is required for vectorized sweeps")
+    jobs = np.asarray(jobs, dtype=float).reshape(-1, 2)
+    hours = jobs[:, 0].reshape(-1, 1, 1, 1)
+    grams = jobs[:, 1].reshape(-1, 1, 1, 1)
+    rate = np.asarray(rates, dtype=float).reshape(1, -1, 1, 1)
+    price = np.asarray(spool_prices, dtype=float).reshape(1, 1, -1, 1)
+    batch = np.asarray(batch_sizes, dtype=float).reshape(1, 1, 1, -1)
+
+    costs = job_cost(rate, power_usage, hours, batch, [(price, grams)])
+    shape = (len(hours), rate.size, price.size, batch.size)
+    return {key: np.broadcast_to(value, shape) for key, value in costs.items() if key != 'spool_costs'}
+
+
+def sweep_rows(jobs, rates, spool_prices, batch_sizes, power_usage):
+    """Yield (job, rate, spool_price, batch_size, total_cost, cost_per_item) rows.
+
+    Uses the vectorized sweep when NumPy is installed and plain loops otherwise.
+    """
+    np = load_numpy()
+    if np is not None:
+        costs = sweep(jobs, rates, spool_prices, batch_sizes, power_usage)
+        totals = costs['total_cost']
+        per_item = costs['cost_per_item']
+        for index in np.ndindex(totals.shape):
+            j, r, p, b = index
+            yield j, rates[r], spool_prices[p], batch_sizes[b], float(totals[index]), float(per_item[index])
+        return
+
+    for (j, (hours, grams)), rate, price, batch in itertools.product(
+            enumerate(jobs), rates, spool_prices, batch_sizes):
+        costs = job_cost(rate, power_usage, hours, batch, [(price, grams)])
+        yield j, rate, price, batch, costs['total_cost'], costs['cost_per_item']
+
+
+def read_jobs_csv(path):
+    """(print_hours, filament_grams) pairs from a batch_cost CSV, skipping failed rows.
+
+    Multi-plate projects have a row per plate and a 'total' row; only the
+    total is kept so that each file is one job.
+    """
+    jobs = []
+    names = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if row.get('error') or not row.get('print_hours'):
+                continue
+            if row.get('plate') not in (None, '', 'total'):
+                continue
+            jobs.append((float(row['print_hours']), float(row['filament_grams'])))
+            names.append(row['file'])
+    return jobs, names
+
+
+def parse_numbers(text):
+    return [float(value) for value in text.split(',') if value.strip()]
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m cost_engine",
+                                     description="Print a what-if price table over tariffs, spool prices and batch sizes.")
+    parser.add_argument('--job', action='append', default=[], metavar='HOURS:GRAMS',
+                        help="a print to cost, may be repeated")
+    parser.add_argument('--jobs', help="CSV written by batch_cost")
+    parser.add_argument('--rates', type=parse_numbers, required=True, help="electricity $/kWh, comma separated")
+    parser.add_argument('--spool-prices', type=parse_numbers, required=True, help="$ per 1 kg spool, comma separated")
+    parser.add_argument('--batch-sizes', type=lambda text: [int(v) for v in parse_numbers(text)], default=[1],
+                        help="items per print, comma separated")
+    parser.add_argument('--power', type=float, default=120.0, help="printer power usage in watts")
+    parser.add_argument('-o', '--output', help="write the table as CSV to this file")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    names = []
+    for spec in args.job:
+        try:
+            hours, grams = spec.split(':')
+            jobs.append((float(hours), float(grams)))
+        except ValueError:
+            parser.error(f"invalid --job {spec!r}, expected HOURS:GRAMS")
+        names.append(spec)
+    if args.jobs:
+        file_jobs, file_names = read_jobs_csv(args.jobs)
+        jobs.extend(file_jobs)
+        names.extend(file_names)
+    if not jobs:
+        parser.error("give at least one --job or a --jobs CSV")
+
+    rows = sweep_rows(jobs, args.rates, args.spool_prices, args.batch_sizes, args.power)
+    header = ['job', 'rate', 'spool_price', 'batch_size', 'total_cost', 'cost_per_item']
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for j, rate, price, batch, total, per_item in rows:
+                writer.writerow([names[j], rate, price, batch, f"{total:.4f}", f"{per_item:.4f}"])
+        return 0
+
+    width = max(len(name) for name in names)
+    print(f"{'Job':<{width}}  {'$/kWh':>7}  {'Spool $':>8}  {'Items':>5}  {'Total':>9}  {'Per Item':>9}")
+    for j, rate, price, batch, total, per_item in rows:
+        print(f"{names[j]:<{width}}  {rate:>7.3f}  {price:>8.2f}  {batch:>5}  ${total:>8.2f}  ${per_item:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+"""Local HTTP/JSON costing service.
+
+Lets other programs (an MES, a quoting script, printer-cost-calculator.html)
+cost G-code with the same parser and cost rules as the desktop app and
+batch_cost:
+
+    python -m cost_server --settings settings.json --allow-dir /srv/jobs
+
+Endpoints:
+    GET  /health                        {"status": "ok", "workers": N}
+    POST /quote                         JSON {"path": ..., "settings": {...}}, or
+                                        {"paths": [...]} for {"quotes": [...]}
+    POST /upload?filename=part.gcode    the raw .gcode or .gcode.3mf as the body,
+                                        settings JSON in an optional X-Settings header
+
+settings has the layout of the app's Save Settings file and defaults to
+--settings. A quote holds the batch_cost rows (one per plate plus a total
+for projects) and the grams per tool. Uploads may use chunked encoding and
+are streamed to a temporary file, never held in memory. Paths are only
+read inside the --allow-dir directories. Browser pages may only call the
+service when --allow-origin names their origin; no CORS headers are sent
+otherwise.
+
+Jobs run in a pool of worker processes that are started, with the parser
+and NumPy imported, before the first connection is accepted. Requests that
+arrive together are batched into one task per worker. When a worker dies the
+pool is replaced, so only the requests it was running fail.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import batch_cost
+
+DEFAULT_PORT = 8765
+# A batch waits this long after its first request for others to join
+BATCH_WINDOW = 0.005
+MAX_BATCH = 64
+MAX_HEAD_SIZE = 64 << 10
+MAX_JSON_SIZE = 1 << 20
+UPLOAD_CHUNK = 1 << 20
+
+# Used when neither --settings nor the request gives settings
+DEFAULT_SETTINGS = {
+    'basic': {'power_cost': "0.15", 'power_usage': "120", 'print_time': "4.5", 'num_items': "1"},
+    'spools': [{'name': "Spool 1", 'cost': "25.00", 'weight': "1000", 'used': "75", 'material': "PLA"}],
+}
+
+REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 422: "Unprocessable Entity",
+           500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    """Raised while handling a request to answer it with an error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def warm_worker():
+    """Pool initializer: import everything a job needs before the first request."""
+    import cost_engine
+    import gcode_3mf
+    import motion_model
+    cost_engine.load_numpy()
+
+
+def start_pool(workers):
+    """Process pool whose workers all start, and warm up, right away."""
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_worker,
+                                   mp_context=multiprocessing.get_context('spawn'))
+    # Submitted all at once, so every worker process is started now
+    tasks = [executor.submit(os.getpid) for _ in range(workers)]
+    return executor, tasks
+
+
+def quote(file_path, settings, use_cache=True, name=None):
+    """Quote for one file; runs in a worker process."""
+    name = name or file_path
+    try:
+        result = batch_cost.parse_job(file_path, use_cache)
+    except Exception as e:
+        return {'file': name, 'error': str(e) or type(e).__name__}
+    factors = [material.mm_per_gram for material in settings['materials']]
+    return {
+        'file': name,
+        'rows': batch_cost.cost_rows(name, result, settings),
+        'tool_grams': [round(grams, 2) for grams in result.tool_grams(factors)],
+        'time_estimated': result.time_estimated,
+    }
+
+
+def quote_batch(jobs):
+    """Run several quote() argument tuples as one pool task."""
+    return [quote(*job) for job in jobs]
+
+
+class Batcher:
+    """Collects jobs submitted close together and runs them as one task per worker."""
+
+    def __init__(self, workers, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.workers = workers
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.executor = None
+
+    async def start(self):
+        """Start the worker pool and wait until every worker is warm."""
+        self.executor, tasks = start_pool(self.workers)
+        await asyncio.gather(*[asyncio.wrap_future(task) for task in tasks])
+
+    def restart(self, broken):
+        """Replace a pool that lost a worker; jobs submitted later run in the new one."""
+        if self.executor is not broken:
+            return  # Already replaced by another failed task
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = start_pool(self.workers)[0]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, *job):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((job, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dealt out round robin so a batch still keeps every worker busy
+            for i in range(min(self.workers, len(batch))):
+                chunk = batch[i::self.workers]
+                executor = self.executor
+                try:
+                    task = loop.run_in_executor(executor, quote_batch, [job for job, _ in chunk])
+                except BrokenProcessPool:
+                    # Broke before a failed task reported it
+                    self.restart(executor)
+                    executor = self.executor
+                    task = loop.run_in_executor(executor, quote_batch, [job for job, _ in chunk])
+                task.add_done_callback(lambda task, chunk=chunk, executor=executor:
+                                       self.resolve(task, chunk, executor))
+
+    def resolve(self, task, chunk, executor):
+        if not task.cancelled() and isinstance(task.exception(), BrokenProcessPool):
+            self.restart(executor)
+        for i, (_, future) in enumerate(chunk):
+            # The client may have gone away and cancelled its future
+            if future.done():
+                continue
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result()[i])
+
+
+def inside(path, directory):
+    try:
+        return os.path.commonpath([path, directory]) == directory
+    except ValueError:
+        return False  # Different drives on Windows
+
+
+class CostServer:
+    def __init__(self, settings, workers=None, allow_dirs=(), allow_origin=None, max_upload=None,
+                 upload_dir=None):
+        self.settings = settings
+        self.workers = max(workers or os.cpu_count() or 1, 1)
+        self.allow_dirs = [os.path.realpath(directory) for directory in allow_dirs]
+        self.allow_origin = allow_origin
+        self.max_upload = max_upload
+        self.upload_dir = upload_dir
+        self.batcher = None
+        self.batch_task = None
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.batcher = Batcher(self.workers)
+        await self.batcher.start()
+        self.batch_task = asyncio.create_task(self.batcher.run())
+        self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEAD_SIZE)
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        if self.batch_task is not None:
+            self.batch_task.cancel()
+        if self.batcher is not None:
+            self.batcher.close()
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection until either side closes it."""
+        try:
+            while await self.handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, reader, writer):
+        """Answer one request; returns whether the connection stays open."""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError:
+            return False
+        except asyncio.LimitOverrunError:
+            await self.respond(writer, 400, {'error': "request head too large"}, False)
+            return False
+
+        start = time.perf_counter()
+        request_line, *header_lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = request_line.split(' ', 2)
+        except ValueError:
+            await self.respond(writer, 400, {'error': "malformed request line"}, False)
+            return False
+        headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        url = urlsplit(target)
+
+        try:
+            status, body = await self.dispatch(method, url, headers, reader, writer)
+        except HTTPError as e:
+            # The body may be left unread, so the connection cannot be reused
+            status, body, keep_alive = e.status, {'error': str(e)}, False
+        except Exception as e:
+            # A crashed worker, for example; the service keeps running
+            status, body, keep_alive = 500, {'error': str(e) or type(e).__name__}, False
+        await self.respond(writer, status, body, keep_alive)
+        print(f"{method} {url.path} {status} {(time.perf_counter() - start) * 1000:.0f} ms", file=sys.stderr)
+        return keep_alive
+
+    async def dispatch(self, method, url, headers, reader, writer):
+        routes = {'/health': 'GET', '/quote': 'POST', '/upload': 'POST'}
+        if url.path not in routes:
+            raise HTTPError(404, f"no such endpoint: {url.path}")
+        if method == 'OPTIONS' and self.allow_origin:
+            return 204, None  # CORS preflight
+        if method != routes[url.path]:
+            raise HTTPError(405, f"{url.path} only accepts {routes[url.path]}")
+        if url.path == '/health':
+            return 200, {'status': "ok", 'workers': self.workers}
+
+        if headers.get('expect', '').lower() == '100-continue':
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        if url.path == '/quote':
+            response = await self.quote_paths(await self.read_json(reader, headers))
+        else:
+            response = await self.upload(reader, headers, parse_qs(url.query))
+        return (422 if 'error' in response else 200), response
+
+    async def iter_body(self, reader, headers, limit=None):
+        """Yield the request body in chunks, sized by Content-Length or chunked encoding."""
+        received = 0
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            while True:
+                try:
+                    size = int((await reader.readline()).split(b';')[0].strip(), 16)
+                except ValueError:
+                    raise HTTPError(400, "malformed chunk size")
+                if size == 0:
+                    # Skip any trailers up to the blank line
+                    while (await reader.readline()).strip():
+                        pass
+                    return
+                received += size
+                if limit is not None and received > limit:
+                    raise HTTPError(413, "request body too large")
+                while size:
+                    data = await reader.read(min(size, UPLOAD_CHUNK))
+                    if not data:
+                        raise HTTPError(400, "incomplete request body")
+                    size -= len(data)
+                    yield data
+                await reader.readexactly(2)
+            return
+
+        try:
+            remaining = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, "malformed Content-Length")
+        if limit is not None and remaining > limit:
+            raise HTTPError(413, "request body too large")
+        while remaining > 0:
+            data = await reader.read(min(remaining, UPLOAD_CHUNK))
+            if not data:
+                raise HTTPError(400, "incomplete request body")
+            remaining -= len(data)
+            yield data
+
+    async def read_json(self, reader, headers):
+        body = b''.join([chunk async for chunk in self.iter_body(reader, headers, MAX_JSON_SIZE)])
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            raise HTTPError(400, f"invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "expected a JSON object")
+        return payload
+
+    def job_settings(self, data):
+        if data is None:
+            return self.settings
+        try:
+            return batch_cost.settings_from_dict(data)
+        except batch_cost.SettingsError as e:
+            raise HTTPError(400, str(e))
+
+    def check_path(self, path):
+        """Resolved path of a job file that this server may read."""
+        if not isinstance(path, str) or not path:
+            raise HTTPError(400, "path must be a non-empty string")
+        real = os.path.realpath(path)
+        if not any(inside(real, directory) for directory in self.allow_dirs):
+            raise HTTPError(403, f"{path} is outside the allowed directories")
+        if not real.lower().endswith(batch_cost.GCODE_SUFFIXES):
+            raise HTTPError(400, f"{path} is not a .gcode or .gcode.3mf file")
+        if not os.path.isfile(real):
+            raise HTTPError(404, f"no such file: {path}")
+        return real
+
+    async def quote_paths(self, payload):
+        settings = self.job_settings(payload.get('settings'))
+        if 'paths' in payload:
+            if not isinstance(payload['paths'], list):
+                raise HTTPError(400, "paths must be a list")
+            paths = [self.check_path(path) for path in payload['paths']]
+            quotes = await asyncio.gather(*[self.batcher.submit(path, settings, True, name)
+                                            for path, name in zip(paths, payload['paths'])])
+            return {'quotes': quotes}
+        path = self.check_path(payload.get('path'))
+        return await self.batcher.submit(path, settings, True, payload['path'])
+
+    async def upload(self, reader, headers, query):
+        name = os.path.basename(query.get('filename', [""])[0]) or "upload.gcode"
+        if not name.lower().endswith(batch_cost.GCODE_SUFFIXES):
+            raise HTTPError(400, f"{name} is not a .gcode or .gcode.3mf file")
+        try:
+            settings = self.job_settings(json.loads(headers['x-settings']) if 'x-settings' in headers else None)
+        except ValueError as e:
+            raise HTTPError(400, f"invalid X-Settings JSON: {e}")
+
+        # The parser picks the format from the suffix
+        suffix = '.gcode.3mf' if name.lower().endswith('.3mf') else '.gcode'
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.upload_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                async for chunk in self.iter_body(reader, headers, self.max_upload):
+                    f.write(chunk)
+            # Uploads are never seen again, so they skip the parse cache
+            return await self.batcher.submit(path, settings, False, name)
+        finally:
+            os.remove(path)
+
+    async def respond(self, writer, status, body, keep_alive):
+        payload = b'' if body is None else json.dumps(body).encode()
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                 f"Content-Length: {len(payload)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        if self.allow_origin:
+            lines += [f"Access-Control-Allow-Origin: {self.allow_origin}",
+                      "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+                      "Access-Control-Allow-Headers: Content-Type, X-Settings",
+                      "Access-Control-Max-Age: 600"]
+            # Lets the configured page reach a service on localhost; never granted to any origin
+            if self.allow_origin != "*":
+                lines.append("Access-Control-Allow-Private-Network: true")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + payload)
+        await writer.drain()
+
+
+async def serve(server, host, port):
+    await server.start(host, port)
+    print(f"Costing service on http://{host}:{port} with {server.workers} warm workers", file=sys.stderr)
+    try:
+        await server.server.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m cost_server",
+                                     description="Serve G-code quotes over local HTTP/JSON.")
+    parser.add_argument('--host', default="127.0.0.1", help="interface to listen on (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"default {DEFAULT_PORT}")
+    parser.add_argument('-s', '--settings', help="settings JSON saved by the app, used when a request has none")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--allow-dir', action='append', default=[], metavar='DIR',
+                        help="directory whose files /quote may read, may be repeated")
+    parser.add_argument('--allow-origin', metavar='ORIGIN',
+                        help="origin of a browser page allowed to call the service, e.g. "
+                             "http://localhost:8000 or null for a page opened from disk (default: none)")
+    parser.add_argument('--max-upload-mb', type=float, default=4096.0, help="largest accepted upload")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.settings:
+            settings = batch_cost.load_settings(args.settings)
+        else:
+            settings = batch_cost.settings_from_dict(DEFAULT_SETTINGS)
+    except batch_cost.SettingsError as e:
+        parser.error(str(e))
+
+    server = CostServer(settings, args.workers, args.allow_dir, args.allow_origin,
+                        int(args.max_upload_mb * (1 << 20)))
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
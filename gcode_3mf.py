@@ -0,0 +1,183 @@
+"""Multi-plate .gcode.3mf projects from Bambu Studio and OrcaSlicer.
+
+A sliced project carries one Metadata/plate_N.gcode member per plate and,
+usually, Metadata/slice_info.config with each plate's predicted time and
+filament use. Plates described there are read without touching their
+G-code; the others are decompressed as streams and parsed concurrently.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import os
+import re
+import xml.etree.ElementTree as ET
+
+import gcode_parser
+from gcode_parser import GCodeError, ParseCancelled, ParseResult, add_lists
+from profiling import phase
+
+SLICE_INFO = 'Metadata/slice_info.config'
+
+
+def plate_index(member):
+    """Plate number of a member such as Metadata/plate_3.gcode."""
+    digits = re.findall(r'\d+', os.path.basename(member))
+    return int(digits[-1]) if digits else 1
+
+
+def read_slice_info(zip_file):
+    """Map plate index -> (metadata dict, [(slot, used_m, used_g), ...])."""
+    try:
+        root = ET.fromstring(zip_file.read(SLICE_INFO))
+    except (KeyError, ET.ParseError):
+        return {}
+
+    plates = {}
+    for plate in root.iter('plate'):
+        meta = {item.get('key'): item.get('value') for item in plate.findall('metadata')}
+        try:
+            index = int(meta['index'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        filaments = []
+        for filament in plate.findall('filament'):
+            try:
+                filaments.append((int(filament.get('id')),
+                                  float(filament.get('used_m') or 0),
+                                  float(filament.get('used_g') or 0)))
+            except (TypeError, ValueError):
+                continue
+        plates[index] = (meta, filaments)
+    return plates
+
+
+def result_from_slice_info(member, meta, filaments):
+    """ParseResult for one plate from slice_info, or None if it lacks time or length."""
+    try:
+        prediction = float(meta['prediction'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    slots = max((slot for slot, _, _ in filaments), default=0)
+    extruder_mm = [0.0] * slots
+    extruder_g = [0.0] * slots
+    for slot, used_m, used_g in filaments:
+        if slot < 1:
+            continue
+        extruder_mm[slot - 1] += used_m * 1000.0
+        extruder_g[slot - 1] += used_g
+    if not sum(extruder_mm):
+        return None
+
+    try:
+        weight = float(meta.get('weight') or 0)
+    except ValueError:
+        weight = 0.0
+    return ParseResult(time_seconds=prediction, filament_mm=sum(extruder_mm),
+                       filament_g=sum(extruder_g) or weight or None,
+                       extruder_mm=extruder_mm, extruder_g=extruder_g,
+                       from_metadata=True, name=member)
+
+
+def add_buckets(buckets):
+    """Sum per-feature dicts, keeping the order features first appear in."""
+    total = {}
+    for bucket in buckets:
+        for name, mm in bucket.items():
+            total[name] = total.get(name, 0.0) + mm
+    return total
+
+
+def combine_results(results):
+    """Project totals of per-plate results; the plates are kept on the result."""
+    times = [r.time_seconds for r in results if r.time_seconds is not None]
+    grams = [r.filament_g for r in results]
+    costs = [r.filament_cost for r in results]
+    total = ParseResult(
+        time_seconds=sum(times) if times else None,
+        filament_mm=sum(r.filament_mm or 0.0 for r in results),
+        total_extrusion=sum(r.total_extrusion for r in results),
+        total_lines=sum(r.total_lines for r in results),
+        total_moves=sum(r.total_moves for r in results),
+        g1_lines=sum(r.g1_lines for r in results),
+        bytes_read=sum(r.bytes_read for r in results),
+        # Only trust a project weight or cost when every plate reported one
+        filament_g=sum(grams) if None not in grams else None,
+        filament_cost=sum(costs) if None not in costs else None,
+        extruder_mm=add_lists([r.extruder_mm for r in results]),
+        extruder_g=add_lists([r.extruder_g for r in results]),
+        extruder_cost=add_lists([r.extruder_cost for r in results]),
+        tool_extrusion=add_lists([r.tool_extrusion for r in results]),
+        feature_extrusion=add_buckets([r.feature_extrusion for r in results]),
+        from_metadata=all(r.from_metadata for r in results),
+        time_estimated=any(r.time_estimated for r in results),
+        plates=list(results),
+    )
+    return total
+
+
+def store_result(results, member, scanned):
+    """Keep a plate's parse, or only its buckets when slice_info already gave the totals."""
+    result = results.get(member)
+    if result is None:
+        results[member] = scanned
+    else:
+        result.layer_extrusion = scanned.layer_extrusion
+        result.feature_extrusion = scanned.feature_extrusion
+
+
+def parse_project(file_path, progress=None, cancel=None, workers=1, estimate=True, breakdown=False,
+                  profile=None):
+    """Parse every plate of a .gcode.3mf and return the combined ParseResult.
+
+    With breakdown, plates described in slice_info are scanned as well, for
+    their layer and feature buckets; their totals still come from slice_info.
+    """
+    with phase(profile, 'metadata'), gcode_parser.open_3mf(file_path) as zip_file:
+        members = gcode_parser.list_gcode_members(zip_file)
+        if not members:
+            raise GCodeError("No G-code file found in the 3MF container")
+        slice_info = read_slice_info(zip_file)
+        sizes = {member: zip_file.getinfo(member).file_size for member in members}
+
+    results = {}
+    pending = []
+    for member in members:
+        info = slice_info.get(plate_index(member))
+        result = result_from_slice_info(member, *info) if info else None
+        if result is not None:
+            results[member] = result
+        if result is None or breakdown:
+            pending.append(member)
+
+    total_size = sum(sizes[member] for member in pending)
+    done = 0
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    if workers > 1:
+        context = multiprocessing.get_context('spawn')
+        with phase(profile, 'workers'), ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {executor.submit(gcode_parser.parse_member, file_path, member, estimate=estimate,
+                                       breakdown=breakdown): member
+                       for member in pending}
+            for future in as_completed(futures):
+                if cancel is not None and cancel.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise ParseCancelled()
+                member = futures[future]
+                store_result(results, member, future.result())
+                done += sizes[member]
+                if progress is not None:
+                    progress(done, total_size)
+    else:
+        for member in pending:
+            def report(member_done, member_total):
+                if progress is not None:
+                    progress(done + member_done, total_size)
+
+            store_result(results, member, gcode_parser.parse_member(file_path, member, progress=report,
+                                                                    cancel=cancel, estimate=estimate,
+                                                                    breakdown=breakdown, profile=profile))
+            done += sizes[member]
+
+    if progress is not None and not pending:
+        progress(1, 1)
+    return combine_results([results[member] for member in members])
@@ -0,0 +1,811 @@
+"""Streaming G-code parser used by the cost calculator.
+
+The parser never holds more than one chunk of the file in memory, so the
+peak footprint stays flat no matter how large the sliced file is. Plain
+files are scanned straight from a memory map; 3MF members are streamed.
+"""
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+import mmap
+import multiprocessing
+import os
+import re
+import zipfile
+
+import materials
+import motion_model
+from profiling import phase
+import slicer_metadata
+
+# Bump whenever parsing rules change so cached results are invalidated
+PARSER_VERSION = 6
+
+# Size of the binary blocks read from the file or 3MF member
+CHUNK_SIZE = 1 << 20
+
+# E values are accumulated as integers of 1/E_SCALE mm (slicers print 5 decimals)
+E_SCALE = 100000
+# Plain files smaller than this are not worth starting worker processes for
+PARALLEL_THRESHOLD = 64 << 20
+
+DIGITS = b'0123456789'
+# First bytes of lines that need normalize_line: N line numbers and lowercase
+NUMBERED = ord('N')
+LOWERCASE = ord('a')
+M73_PATTERN = re.compile(rb'M73 P\d+ R(\d+)')
+TOOL_PATTERN = re.compile(rb'T(\d+)(?![\d.])')
+# The number of a word that is not followed by a space, e.g. E1.5F1800 or E1.5<tab>F1800
+NUMBER_PATTERN = re.compile(rb'[-+]?(?:\d+\.?\d*|\.\d+)')
+# Higher tool numbers are firmware specials (Bambu T255, T1000), not filaments
+MAX_TOOLS = 64
+# Comments that start a layer (Cura, PrusaSlicer/OrcaSlicer, Bambu Studio) and
+# that name the feature printed next
+LAYER_MARKERS = (b';LAYER:', b';LAYER_CHANGE', b'; CHANGE_LAYER')
+FEATURE_MARKERS = (b';TYPE:', b'; FEATURE:')
+
+
+class GCodeError(Exception):
+    """Raised when a file cannot be read as G-code."""
+
+
+class ParseCancelled(Exception):
+    """Raised when a parse is stopped through its cancel event."""
+
+
+@dataclass
+class ParseResult:
+    time_seconds: float = None
+    filament_mm: float = None
+    total_extrusion: float = 0.0
+    total_lines: int = 0
+    total_moves: int = 0
+    g1_lines: int = 0
+    bytes_read: int = 0
+    # Totals from the slicer summary comments, when present
+    filament_g: float = None
+    filament_cost: float = None
+    extruder_mm: list = field(default_factory=list)
+    extruder_g: list = field(default_factory=list)
+    extruder_cost: list = field(default_factory=list)
+    from_metadata: bool = False
+    # Name of the 3MF member, and per-plate results of a multi-plate project
+    name: str = None
+    plates: list = field(default_factory=list)
+    # Extrusion in mm per tool (T0, T1, ...) from the full scan
+    tool_extrusion: list = field(default_factory=list)
+    # True when time_seconds comes from the motion model, not the slicer
+    time_estimated: bool = False
+    # Extrusion in mm per layer (index 0: before the first layer marker) and
+    # per feature type ('' before the first ;TYPE:), from the full scan
+    layer_extrusion: list = field(default_factory=list)
+    feature_extrusion: dict = field(default_factory=dict)
+
+    def grams(self, mm_per_gram=None):
+        """Filament weight: the slicer's figure when known, else from the length.
+
+        mm_per_gram is a conversion factor (see materials.Material) or a list
+        of factors indexed by tool; PLA 1.75 mm is assumed when omitted.
+        """
+        if self.filament_g:
+            return self.filament_g
+        return sum(self.tool_grams(mm_per_gram))
+
+    def tool_grams(self, mm_per_gram=None):
+        """Filament weight per tool/extruder, one entry per spool."""
+        if self.plates:
+            return add_lists([plate.tool_grams(mm_per_gram) for plate in self.plates])
+        if any(self.extruder_g):
+            return list(self.extruder_g)
+        if any(self.extruder_mm):
+            tool_mm = self.extruder_mm
+        elif sum(self.tool_extrusion) > 0:
+            # Split the reported length in the proportions the scan measured
+            scanned = sum(self.tool_extrusion)
+            tool_mm = [(self.filament_mm or 0.0) * mm / scanned for mm in self.tool_extrusion]
+        else:
+            tool_mm = [self.filament_mm or 0.0]
+        return [mm / tool_factor(mm_per_gram, tool) for tool, mm in enumerate(tool_mm)]
+
+    def has_breakdown(self):
+        """True when the layer and feature buckets were filled by a scan."""
+        if self.plates:
+            return all(plate.has_breakdown() for plate in self.plates)
+        return bool(self.layer_extrusion)
+
+    def breakdown(self, mm_per_gram=None, total_cost=None):
+        """Yield (plate, kind, name, filament_mm, grams, seconds, cost) per bucket.
+
+        kind is 'feature' or 'layer'. The scan only measures extrusion, so
+        the weight, print time and cost of the job are shared out in
+        proportion to each bucket's filament; the rows add up to the totals.
+        """
+        if self.plates:
+            grams = self.grams(mm_per_gram)
+            for plate in self.plates:
+                # Each plate's share of the project cost follows its weight
+                plate_cost = None
+                if total_cost is not None and grams:
+                    plate_cost = total_cost * plate.grams(mm_per_gram) / grams
+                yield from plate.breakdown(mm_per_gram, plate_cost)
+            return
+
+        scanned = sum(self.layer_extrusion)
+        grams = self.grams(mm_per_gram)
+        buckets = [('feature', name or "other", mm) for name, mm in self.feature_extrusion.items()]
+        buckets += [('layer', str(layer), mm) for layer, mm in enumerate(self.layer_extrusion)]
+        for kind, name, mm in buckets:
+            share = mm / scanned if scanned else 0.0
+            yield (self.name, kind, name, mm, grams * share,
+                   None if self.time_seconds is None else self.time_seconds * share,
+                   None if total_cost is None else total_cost * share)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a result (and its plates) from dataclasses.asdict output."""
+        data = dict(data)
+        data['plates'] = [cls.from_dict(plate) for plate in data.get('plates', [])]
+        return cls(**data)
+
+
+def tool_factor(mm_per_gram, tool):
+    """Conversion factor for one tool from a factor or a per-tool list."""
+    if isinstance(mm_per_gram, (int, float)):
+        return mm_per_gram
+    if not mm_per_gram:
+        return materials.get_material(materials.DEFAULT_MATERIAL).mm_per_gram
+    return mm_per_gram[min(tool, len(mm_per_gram) - 1)]
+
+
+def add_lists(lists):
+    """Element-wise sum of per-extruder lists of different lengths."""
+    total = [0.0] * max((len(values) for values in lists), default=0)
+    for values in lists:
+        for i, value in enumerate(values):
+            total[i] += value
+    return total
+
+
+def bucket_dict(feature_extruded):
+    """Per-feature integer units as mm, dropping the inherited (None) bucket."""
+    return {name: units / E_SCALE for name, units in feature_extruded.items() if name is not None}
+
+
+def normalize_line(line):
+    """Uppercase a stripped line and drop its N line number and *checksum."""
+    line = line.upper()
+    if line[:1] == b'N':
+        start = 1
+        while line[start:start + 1].isdigit():
+            start += 1
+        line = line[start:]
+        star = line.rfind(b'*')
+        if star >= 0:
+            line = line[:star]
+        line = line.strip()
+    return line
+
+
+def tool_list(tool_extruded):
+    """Per-tool integer units as a list of mm indexed by tool number."""
+    tools = [tool for tool in tool_extruded if tool is not None]
+    extrusion = [0.0] * (max(tools) + 1 if tools else 0)
+    for tool in tools:
+        extrusion[tool] = tool_extruded[tool] / E_SCALE
+    return extrusion
+
+
+class GCodeParser:
+    """Incremental parser fed with raw bytes, one chunk at a time.
+
+    E positions are tracked in integer units of 1/E_SCALE mm so that totals
+    from separately parsed pieces of a file add up exactly. A parser created
+    with e_known=False starts at an unknown E position: the delta of its
+    first absolute move is then left in first_e for the caller to resolve.
+
+    Layer and feature comments only book the extrusion since the previous
+    marker into compact buckets, so the moves themselves cost nothing extra.
+    """
+
+    def __init__(self, absolute_e=True, e_known=True, tool=0, feature=''):
+        self.result = ParseResult()
+        self.absolute_e = absolute_e
+        self.e_known = e_known
+        # Absolute E position, or the offset from the unknown start position
+        self.current_e = 0
+        self.first_e = None
+        self.extruded = 0
+        # Active tool (None: inherited from the previous piece) and the
+        # extrusion per tool, flushed on every tool change
+        self.tool = tool
+        self.first_e_tool = tool
+        self.tool_extruded = {}
+        self.tool_start = 0
+        # Layer 0 holds what comes before the first marker (or, for a piece
+        # of a file, the end of the layer the previous piece was in)
+        self.layer_extruded = array('q', [0])
+        self.layer_start = 0
+        self.first_e_layer = 0
+        # Active feature (None: inherited) and the extrusion per feature
+        self.feature = feature
+        self.first_e_feature = feature
+        self.feature_extruded = {}
+        self.feature_start = 0
+        self._pending = b''
+
+    def feed(self, chunk):
+        self.feed_lines(self.split(chunk))
+
+    def split(self, chunk):
+        """Complete lines of a chunk, with any carried over from the last one."""
+        self.result.bytes_read += len(chunk)
+        lines = (self._pending + chunk).split(b'\n')
+        # The last piece may be an incomplete line, keep it for the next chunk
+        self._pending = lines.pop()
+        return lines
+
+    def finish(self):
+        if self._pending:
+            self.feed_lines([self._pending])
+            self._pending = b''
+
+        self.switch_tool(self.tool)
+        self.switch_feature(self.feature)
+        self.book_layer()
+        result = self.result
+        result.total_extrusion = self.extruded / E_SCALE
+        result.tool_extrusion = tool_list(self.tool_extruded)
+        result.layer_extrusion = [units / E_SCALE for units in self.layer_extruded]
+        result.feature_extrusion = bucket_dict(self.feature_extruded)
+        if result.filament_mm is None or result.filament_mm <= 0:
+            result.filament_mm = result.total_extrusion
+        return result
+
+    def switch_tool(self, tool):
+        """Book the extrusion since the last change to the active tool."""
+        if self.extruded != self.tool_start:
+            self.tool_extruded[self.tool] = self.tool_extruded.get(self.tool, 0) + self.extruded - self.tool_start
+            self.tool_start = self.extruded
+        self.tool = tool
+
+    def switch_feature(self, feature):
+        if self.extruded != self.feature_start:
+            self.feature_extruded[self.feature] = (self.feature_extruded.get(self.feature, 0)
+                                                   + self.extruded - self.feature_start)
+            self.feature_start = self.extruded
+        self.feature = feature
+
+    def book_layer(self):
+        self.layer_extruded[-1] += self.extruded - self.layer_start
+        self.layer_start = self.extruded
+
+    def next_layer(self):
+        self.book_layer()
+        self.layer_extruded.append(0)
+
+    def feed_line(self, line):
+        self.feed_lines([line])
+
+    def feed_lines(self, lines):
+        """Tokenize complete lines (bytes, without the newline).
+
+        Each line is classified by its first bytes so the common G0/G1 moves
+        only pay for a few bytes.find calls. Regexes run on the rare M73 and
+        T lines only, and comments are only checked for layer and feature
+        markers. Lines that start in lowercase or with an N line number go
+        through normalize_line first. G0 moves with an E word extrude like
+        G1, as they do in Marlin and Klipper.
+        """
+        result = self.result
+        absolute_e = self.absolute_e
+        e_known = self.e_known
+        current_e = self.current_e
+        extruded = self.extruded
+        moves = 0
+        g1_lines = 0
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] >= LOWERCASE or line[0] == NUMBERED:
+                line = normalize_line(line)
+            head = line[:2]
+
+            if head == b'G1' or head == b'G0':
+                if len(line) > 2 and line[2] in DIGITS:
+                    continue  # G10, G11, ... are not moves
+                if head == b'G1':
+                    g1_lines += 1
+                comment = line.find(b';')
+                if comment >= 0:
+                    line = line[:comment]
+                start = line.find(b'E', 2)
+                if start < 0:
+                    # Words in another case than the command, e.g. G1 X5 e0.4
+                    start = line.find(b'e', 2)
+                    if start < 0:
+                        continue
+                end = line.find(b' ', start)
+                try:
+                    new_e = round(float(line[start + 1:end] if end > 0 else line[start + 1:]) * E_SCALE)
+                except ValueError:
+                    number = NUMBER_PATTERN.match(line, start + 1)
+                    if number is None:
+                        continue
+                    new_e = round(float(number.group()) * E_SCALE)
+                moves += 1
+                if absolute_e:
+                    if e_known:
+                        extrusion = new_e - current_e
+                    else:
+                        self.first_e = new_e - current_e
+                        self.first_e_tool = self.tool
+                        self.first_e_layer = len(self.layer_extruded) - 1
+                        self.first_e_feature = self.feature
+                        e_known = True
+                        extrusion = 0
+                    current_e = new_e
+                else:
+                    extrusion = new_e
+                    current_e += new_e
+                if extrusion > 0:
+                    extruded += extrusion
+
+            elif head == b'G9':
+                if line[2:3] != b'2' or (len(line) > 3 and line[3] in DIGITS):
+                    continue
+                comment = line.find(b';')
+                if comment >= 0:
+                    line = line[:comment]
+                start = line.find(b'E', 3)
+                if start < 0:
+                    start = line.find(b'e', 3)
+                if start < 0:
+                    # A bare G92 resets every axis
+                    if line.rstrip() == b'G92':
+                        current_e = 0
+                        e_known = True
+                    continue
+                end = line.find(b' ', start)
+                try:
+                    current_e = round(float(line[start + 1:end] if end > 0 else line[start + 1:]) * E_SCALE)
+                except ValueError:
+                    number = NUMBER_PATTERN.match(line, start + 1)
+                    if number is None:
+                        continue
+                    current_e = round(float(number.group()) * E_SCALE)
+                e_known = True
+
+            elif head == b'M8':
+                if len(line) > 3 and line[3] in DIGITS:
+                    continue
+                code = line[2:3]
+                if code == b'3':
+                    absolute_e = False
+                elif code == b'2':
+                    absolute_e = True
+
+            elif head == b'M7':
+                if result.time_seconds is None:
+                    time_match = M73_PATTERN.match(line)
+                    if time_match:
+                        result.time_seconds = float(time_match.group(1)) * 60
+
+            elif head[:1] == b'T':
+                # Tool change; AMS/MMU filament switches are issued as Tn too
+                tool_match = TOOL_PATTERN.match(line)
+                if tool_match:
+                    tool = int(tool_match.group(1))
+                    if tool < MAX_TOOLS and tool != self.tool:
+                        self.extruded = extruded
+                        self.switch_tool(tool)
+
+            elif head[:1] == b';':
+                if line.startswith(LAYER_MARKERS):
+                    self.extruded = extruded
+                    self.next_layer()
+                elif line.startswith(FEATURE_MARKERS):
+                    self.extruded = extruded
+                    name = line[line.find(b':') + 1:].strip()
+                    self.switch_feature(name.decode('utf-8', 'replace'))
+
+        self.absolute_e = absolute_e
+        self.e_known = e_known
+        self.current_e = current_e
+        self.extruded = extruded
+        result.total_moves += moves
+        result.g1_lines += g1_lines
+        result.total_lines += len(lines)
+
+
+def list_gcode_members(zip_file):
+    """G-code members of a 3MF container, in plate order."""
+    def plate_key(name):
+        digits = re.findall(r'\d+', name)
+        return (int(digits[-1]) if digits else 0, name)
+
+    return sorted((f for f in zip_file.namelist() if f.endswith('.gcode')), key=plate_key)
+
+
+def open_3mf(file_path):
+    try:
+        return zipfile.ZipFile(file_path, 'r')
+    except zipfile.BadZipFile:
+        raise GCodeError("Invalid or corrupted 3MF container")
+
+
+def open_gcode(file_path, member=None):
+    """Open a plain .gcode file or one G-code member of a .gcode.3mf.
+
+    Without a member name the first plate of a 3MF is opened. Returns a
+    binary stream and the uncompressed size of its content.
+    """
+    if is_3mf(file_path):
+        zip_file = open_3mf(file_path)
+        if member is None:
+            gcode_files = list_gcode_members(zip_file)
+            if not gcode_files:
+                zip_file.close()
+                raise GCodeError("No G-code file found in the 3MF container")
+            member = gcode_files[0]
+        try:
+            size = zip_file.getinfo(member).file_size
+        except KeyError:
+            zip_file.close()
+            raise GCodeError(f"{member} not found in the 3MF container")
+        # Members are decompressed as they are read, never extracted whole
+        stream = zip_file.open(member)
+        # The member keeps its own handle on the archive, the ZipFile can go
+        zip_file.close()
+        return stream, size
+    return open(file_path, 'rb'), os.path.getsize(file_path)
+
+
+def parse_stream(stream, chunk_size=CHUNK_SIZE, total_size=None, progress=None, cancel=None, profile=None,
+                 tail=None):
+    """Parse a binary stream chunk by chunk.
+
+    progress is called as progress(bytes_done, total_size) after every chunk
+    and cancel is an object with is_set() (e.g. threading.Event) that stops
+    the parse with ParseCancelled. profile is a profiling.Profile or None.
+    tail, a bytearray, is left holding the last slicer_metadata.PROBE_SIZE
+    bytes of the stream.
+    """
+    parser = GCodeParser()
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise ParseCancelled()
+        with phase(profile, 'read'):
+            chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if tail is not None:
+            tail += chunk
+            del tail[:-slicer_metadata.PROBE_SIZE]
+        with phase(profile, 'split'):
+            lines = parser.split(chunk)
+        with phase(profile, 'scan'):
+            parser.feed_lines(lines)
+        if progress is not None:
+            progress(parser.result.bytes_read, total_size)
+    return parser.finish()
+
+
+def find_mode_switches(buffer):
+    """Return (offset, absolute_e) for every M82/M83 line in a bytes-like buffer.
+
+    Uses the C-level find so the scan costs far less than tokenizing, which
+    lets the parallel path know the extrusion mode at every split point.
+    Matches the lines feed_lines reads: either case, after an N line number.
+    """
+    switches = []
+    for command in (b'M8', b'm8'):
+        pos = buffer.find(command)
+        while pos >= 0:
+            code = buffer[pos + 2:pos + 3]
+            if code in (b'2', b'3') and not buffer[pos + 3:pos + 4].isdigit():
+                line_start = buffer.rfind(b'\n', 0, pos) + 1
+                prefix = bytes(buffer[line_start:pos]).strip()
+                if not prefix or (prefix[:1] in b'Nn' and prefix[1:].isdigit()):
+                    switches.append((pos, code == b'2'))
+            pos = buffer.find(command, pos + 2)
+    switches.sort()
+    return switches
+
+
+def split_points(buffer, pieces):
+    """Offsets that cut a buffer into roughly equal pieces at line starts."""
+    size = len(buffer)
+    points = [0]
+    for i in range(1, pieces):
+        offset = buffer.find(b'\n', max(size * i // pieces, points[-1])) + 1
+        if not offset or offset >= size:
+            break
+        if offset > points[-1]:
+            points.append(offset)
+    points.append(size)
+    return points
+
+
+def iter_mapped_lines(buffer, start=0, end=None, chunk_size=CHUNK_SIZE):
+    """Yield (start, stop, lines) windows of complete lines from a mapped buffer.
+
+    Windows are cut at the last newline before chunk_size, so no partial line
+    is carried between windows and nothing is ever decoded.
+    """
+    end = len(buffer) if end is None else end
+    pos = start
+    while pos < end:
+        limit = min(pos + chunk_size, end)
+        stop = buffer.rfind(b'\n', pos, limit) + 1
+        if not stop:
+            # A line longer than the window, or an unterminated last line
+            stop = buffer.find(b'\n', limit, end) + 1 or end
+        lines = buffer[pos:stop].split(b'\n')
+        if buffer[stop - 1] == 0x0A:
+            lines.pop()
+        yield pos, stop, lines
+        pos = stop
+
+
+def feed_mapped(parser, buffer, start, end, chunk_size=CHUNK_SIZE, progress=None, cancel=None,
+                profile=None):
+    windows = iter_mapped_lines(buffer, start, end, chunk_size)
+    if profile is not None:
+        windows = profile.timed('split', windows)
+    for window_start, window_stop, lines in windows:
+        if cancel is not None and cancel.is_set():
+            raise ParseCancelled()
+        parser.result.bytes_read += window_stop - window_start
+        with phase(profile, 'scan'):
+            parser.feed_lines(lines)
+        if progress is not None:
+            progress(window_stop - start, end - start)
+
+
+def parse_mapped(file_path, start=0, end=None, parser=None, chunk_size=CHUNK_SIZE,
+                 progress=None, cancel=None, profile=None):
+    """Parse bytes [start, end) of a plain file straight from a memory map."""
+    parser = parser or GCodeParser()
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if end is None else end
+        if end > start:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                feed_mapped(parser, buffer, start, end, chunk_size, progress, cancel, profile)
+    parser.finish()
+    return parser
+
+
+def parse_range(file_path, start, end, absolute_e, chunk_size=CHUNK_SIZE):
+    """Parse bytes [start, end) of a plain file from an unknown E position.
+
+    Returns the parser so the caller can stitch pieces together in order.
+    """
+    parser = GCodeParser(absolute_e=absolute_e, e_known=start == 0, tool=0 if start == 0 else None,
+                         feature='' if start == 0 else None)
+    return parse_mapped(file_path, start, end, parser, chunk_size)
+
+
+def merge_pieces(parsers):
+    """Stitch the parsers of consecutive pieces into one ParseResult."""
+    result = ParseResult()
+    extruded = 0
+    current_e = 0
+    tool = 0
+    tool_extruded = {}
+    feature = ''
+    feature_extruded = {}
+    layer_extruded = array('q', [0])
+    for parser in parsers:
+        piece = parser.result
+        if result.time_seconds is None:
+            result.time_seconds = piece.time_seconds
+        result.total_lines += piece.total_lines
+        result.total_moves += piece.total_moves
+        result.g1_lines += piece.g1_lines
+        result.bytes_read += piece.bytes_read
+
+        extruded += parser.extruded
+        for piece_tool, units in parser.tool_extruded.items():
+            piece_tool = tool if piece_tool is None else piece_tool
+            tool_extruded[piece_tool] = tool_extruded.get(piece_tool, 0) + units
+        for piece_feature, units in parser.feature_extruded.items():
+            piece_feature = feature if piece_feature is None else piece_feature
+            feature_extruded[piece_feature] = feature_extruded.get(piece_feature, 0) + units
+        # The piece's layer 0 continues the layer the previous piece ended in
+        base = len(layer_extruded) - 1
+        layer_extruded[-1] += parser.layer_extruded[0]
+        layer_extruded.extend(parser.layer_extruded[1:])
+        if parser.first_e is not None:
+            # First absolute move of the piece, measured from where the previous one stopped
+            extrusion = parser.first_e - current_e
+            if extrusion > 0:
+                extruded += extrusion
+                first_tool = tool if parser.first_e_tool is None else parser.first_e_tool
+                tool_extruded[first_tool] = tool_extruded.get(first_tool, 0) + extrusion
+                first_feature = feature if parser.first_e_feature is None else parser.first_e_feature
+                feature_extruded[first_feature] = feature_extruded.get(first_feature, 0) + extrusion
+                layer_extruded[base + parser.first_e_layer] += extrusion
+        current_e = parser.current_e if parser.e_known else current_e + parser.current_e
+        if parser.tool is not None:
+            tool = parser.tool
+        if parser.feature is not None:
+            feature = parser.feature
+
+    result.total_extrusion = extruded / E_SCALE
+    result.tool_extrusion = tool_list(tool_extruded)
+    result.layer_extrusion = [units / E_SCALE for units in layer_extruded]
+    result.feature_extrusion = bucket_dict(feature_extruded)
+    result.filament_mm = result.total_extrusion
+    return result
+
+
+def parse_file_parallel(file_path, workers=None, progress=None, cancel=None, profile=None):
+    """Parse a plain .gcode file across a process pool.
+
+    The file is cut at line boundaries, every piece is parsed from an
+    unknown E position and the pieces are merged in order, which gives
+    exactly the same extrusion total as the serial parser.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return parse_file(file_path, workers=1)
+
+    with phase(profile, 'split'), open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            # A few pieces per worker keeps the cores busy and the progress smooth
+            points = split_points(buffer, workers * 4)
+            switches = find_mode_switches(buffer)
+
+    # Extrusion mode in effect at the start of every piece
+    modes = []
+    absolute_e = True
+    index = 0
+    for start in points[:-1]:
+        while index < len(switches) and switches[index][0] < start:
+            absolute_e = switches[index][1]
+            index += 1
+        modes.append(absolute_e)
+
+    pieces = [None] * len(modes)
+    done = 0
+    context = multiprocessing.get_context('spawn')
+    with phase(profile, 'workers'), ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(parse_range, file_path, points[i], points[i + 1], modes[i]): i
+            for i in range(len(modes))
+        }
+        for future in as_completed(futures):
+            if cancel is not None and cancel.is_set():
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise ParseCancelled()
+            i = futures[future]
+            pieces[i] = future.result()
+            done += points[i + 1] - points[i]
+            if progress is not None:
+                progress(done, size)
+
+    return merge_pieces(pieces)
+
+
+def is_3mf(file_path):
+    return file_path.endswith('.gcode.3mf') or file_path.endswith('.3mf')
+
+
+def scan_file(file_path, chunk_size=CHUNK_SIZE, progress=None, cancel=None, workers=1, member=None,
+              profile=None, tail=None):
+    """Run the full extrusion scan over a .gcode file or a .gcode.3mf member.
+
+    With workers > 1, large plain files are parsed in parallel. tail is
+    filled as by parse_stream, for 3MF members only.
+    """
+    if workers != 1 and not is_3mf(file_path) and os.path.getsize(file_path) >= PARALLEL_THRESHOLD:
+        return parse_file_parallel(file_path, workers, progress, cancel, profile)
+    if not is_3mf(file_path):
+        return parse_mapped(file_path, chunk_size=chunk_size, progress=progress, cancel=cancel,
+                            profile=profile).result
+
+    with phase(profile, 'read'):
+        stream, size = open_gcode(file_path, member)
+    with stream:
+        return parse_stream(stream, chunk_size, size, progress, cancel, profile, tail)
+
+
+def probe_file(file_path, member=None, tail=None):
+    """Read only the slicer summary comments at the head and tail of the file.
+
+    tail is passed on to slicer_metadata.probe_stream.
+    """
+    stream, size = open_gcode(file_path, member)
+    with stream:
+        return slicer_metadata.probe_stream(stream, size, tail=tail)
+
+
+def apply_metadata(result, metadata):
+    if metadata.time_seconds is not None:
+        result.time_seconds = metadata.time_seconds
+    if metadata.filament_mm:
+        result.filament_mm = metadata.filament_mm
+    result.filament_g = metadata.filament_g
+    result.filament_cost = metadata.filament_cost
+    result.extruder_mm = metadata.extruder_mm
+    result.extruder_g = metadata.extruder_g
+    result.extruder_cost = metadata.extruder_cost
+    return result
+
+
+def estimate_time(file_path, member=None, chunk_size=CHUNK_SIZE, progress=None, cancel=None, profile=None):
+    """Print time in seconds simulated from the moves of the file (see motion_model)."""
+    estimator = motion_model.MotionEstimator()
+    with phase(profile, 'read'):
+        stream, size = open_gcode(file_path, member)
+    with stream:
+        done = 0
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise ParseCancelled()
+            with phase(profile, 'read'):
+                chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            with phase(profile, 'estimate'):
+                estimator.feed(chunk)
+            done += len(chunk)
+            if progress is not None:
+                progress(done, size)
+    with phase(profile, 'estimate'):
+        return estimator.finish()
+
+
+def parse_member(file_path, member=None, chunk_size=CHUNK_SIZE, progress=None, cancel=None, workers=1,
+                 estimate=True, breakdown=False, profile=None):
+    """Parse one G-code stream: a plain file, or a single 3MF member.
+
+    The slicer summary comments are tried first; the full extrusion scan
+    only runs when they do not give both the print time and the filament,
+    or when breakdown is true and the per-layer and per-feature buckets
+    are wanted. When neither gives a print time and estimate is true, the
+    time is simulated from the toolpath in a second pass.
+
+    A 3MF member is inflated as it is read, so only its head is probed
+    first and the comments at its tail are taken from the scan.
+    """
+    zipped = is_3mf(file_path)
+    with phase(profile, 'metadata'):
+        metadata = probe_file(file_path, member, tail=False if zipped else None)
+    if metadata.complete and not breakdown:
+        result = ParseResult()
+        if progress is not None:
+            progress(1, 1)
+    else:
+        tail = bytearray() if zipped else None
+        result = scan_file(file_path, chunk_size, progress, cancel, workers, member, profile, tail)
+        if zipped:
+            with phase(profile, 'metadata'):
+                metadata = probe_file(file_path, member, tail=bytes(tail))
+    result.from_metadata = metadata.complete
+    result.name = member
+    apply_metadata(result, metadata)
+    if result.time_seconds is None and estimate:
+        result.time_seconds = estimate_time(file_path, member, chunk_size, progress, cancel, profile)
+        result.time_estimated = True
+    return result
+
+
+def parse_file(file_path, chunk_size=CHUNK_SIZE, progress=None, cancel=None, workers=1, estimate=True,
+               breakdown=False, profile=None):
+    """Parse a .gcode or .gcode.3mf file and return a ParseResult.
+
+    For a 3MF project every plate is parsed; the returned result holds the
+    totals and the per-plate results in its plates list. profile is a
+    profiling.Profile that gets the time of every phase.
+    """
+    if is_3mf(file_path):
+        # Imported here because gcode_3mf builds on this module
+        import gcode_3mf
+        return gcode_3mf.parse_project(file_path, progress=progress, cancel=cancel, workers=workers,
+                                       estimate=estimate, breakdown=breakdown, profile=profile)
+    return parse_member(file_path, None, chunk_size, progress, cancel, workers, estimate, breakdown, profile)
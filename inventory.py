@@ -0,0 +1,261 @@
+"""Filament inventory kept in SQLite.
+
+Every change to a spool's stock (loading it, a print deducting from it, a
+manual correction) is appended to an event ledger that is never updated or
+deleted. A trigger keeps the per-spool balances table in step with the
+ledger, so remaining weights are a primary-key lookup and the reports below
+are single indexed queries however long the history grows.
+
+Usage:
+    python -m inventory                 # remaining grams by material, cost this month
+    python -m inventory --history 20    # latest ledger events
+"""
+from datetime import datetime
+import os
+import sqlite3
+import sys
+import time
+
+from app_dirs import config_dir
+
+INVENTORY_FILE_NAME = "inventory.sqlite3"
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS spools ("
+    "id INTEGER PRIMARY KEY, name TEXT NOT NULL, material TEXT NOT NULL, "
+    "cost REAL NOT NULL, spool_weight REAL NOT NULL, active INTEGER NOT NULL DEFAULT 1, "
+    "created REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS events ("
+    "id INTEGER PRIMARY KEY, spool_id INTEGER NOT NULL REFERENCES spools (id), "
+    "ts REAL NOT NULL, kind TEXT NOT NULL, grams REAL NOT NULL, cost REAL NOT NULL, job TEXT)",
+    "CREATE TABLE IF NOT EXISTS balances ("
+    "spool_id INTEGER PRIMARY KEY REFERENCES spools (id), grams REAL NOT NULL, "
+    "consumed_grams REAL NOT NULL, consumed_cost REAL NOT NULL, updated REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS spools_material ON spools (material, active)",
+    "CREATE INDEX IF NOT EXISTS events_ts ON events (ts)",
+    "CREATE INDEX IF NOT EXISTS events_spool ON events (spool_id, ts)",
+    # Materialized balances, maintained by the database on every new event
+    "CREATE TRIGGER IF NOT EXISTS events_balance AFTER INSERT ON events BEGIN "
+    "INSERT INTO balances VALUES (NEW.spool_id, NEW.grams, 0, 0, NEW.ts) "
+    "ON CONFLICT (spool_id) DO UPDATE SET grams = grams + NEW.grams, "
+    "consumed_grams = consumed_grams + CASE WHEN NEW.kind = 'deduct' THEN -NEW.grams ELSE 0 END, "
+    "consumed_cost = consumed_cost + NEW.cost, updated = NEW.ts; END",
+    # The ledger is append-only
+    "CREATE TRIGGER IF NOT EXISTS events_no_update BEFORE UPDATE ON events BEGIN "
+    "SELECT RAISE(ABORT, 'inventory events are append-only'); END",
+    "CREATE TRIGGER IF NOT EXISTS events_no_delete BEFORE DELETE ON events BEGIN "
+    "SELECT RAISE(ABORT, 'inventory events are append-only'); END",
+]
+
+
+class InventoryError(Exception):
+    """Raised when a deduction or correction cannot be applied."""
+
+
+def insert_spool(conn, name, material, cost, grams, spool_weight):
+    now = time.time()
+    spool_id = conn.execute(
+        "INSERT INTO spools (name, material, cost, spool_weight, created) VALUES (?, ?, ?, ?, ?)",
+        (name, material, cost, spool_weight, now)).lastrowid
+    conn.execute("INSERT INTO events (spool_id, ts, kind, grams, cost) VALUES (?, ?, 'load', ?, 0)",
+                 (spool_id, now, grams))
+    return spool_id
+
+
+def adjust_balance(conn, spool_id, grams, job=None):
+    row = conn.execute("SELECT grams FROM balances WHERE spool_id = ?", (spool_id,)).fetchone()
+    delta = grams - (row[0] if row else 0.0)
+    if delta:
+        conn.execute("INSERT INTO events (spool_id, ts, kind, grams, cost, job) "
+                     "VALUES (?, ?, 'adjust', ?, 0, ?)", (spool_id, time.time(), delta, job))
+
+
+def deduct_usages(conn, usages, job=None):
+    now = time.time()
+    for spool_id, grams in usages:
+        row = conn.execute(
+            "SELECT s.name, s.cost, s.spool_weight, b.grams FROM spools s "
+            "JOIN balances b ON b.spool_id = s.id WHERE s.id = ?", (spool_id,)).fetchone()
+        if row is None:
+            raise InventoryError(f"Unknown spool {spool_id}")
+        name, cost, spool_weight, remaining = row
+        if grams > remaining + 1e-9:
+            raise InventoryError(f"Used weight ({grams}g) cannot be greater than "
+                                 f"remaining weight ({remaining}g) for {name}")
+        conn.execute("INSERT INTO events (spool_id, ts, kind, grams, cost, job) "
+                     "VALUES (?, ?, 'deduct', ?, ?, ?)",
+                     (spool_id, now, -grams, grams * cost / spool_weight, job))
+
+
+def month_start(now=None):
+    """Timestamp of midnight on the first day of the current (local) month."""
+    now = datetime.fromtimestamp(now if now is not None else time.time())
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+class Inventory:
+    """Spools, their ledger and balances in one SQLite file.
+
+    Like ParseCache, a new connection is opened for every call so the
+    inventory can be shared by the GUI and worker threads.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(config_dir(), INVENTORY_FILE_NAME)
+        self._ready = False
+
+    def _connect(self):
+        if self._ready:
+            return sqlite3.connect(self.path)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+        self._ready = True
+        return conn
+
+    def _run(self, func):
+        """Run func(conn) in one transaction and close the connection."""
+        conn = self._connect()
+        try:
+            with conn:
+                return func(conn)
+        finally:
+            conn.close()
+
+    def add_spool(self, name, material, cost, grams, spool_weight=1000.0):
+        """Register a spool holding grams of filament and return its id."""
+        return self._run(lambda conn: insert_spool(conn, name, material, cost, grams, spool_weight))
+
+    def update_spool(self, spool_id, name, material, cost, spool_weight=1000.0):
+        self._run(lambda conn: conn.execute(
+            "UPDATE spools SET name = ?, material = ?, cost = ?, spool_weight = ? WHERE id = ?",
+            (name, material, cost, spool_weight, spool_id)))
+
+    def retire_spool(self, spool_id):
+        """Hide a spool from the active list; its events stay in the ledger."""
+        self._run(lambda conn: conn.execute("UPDATE spools SET active = 0 WHERE id = ?", (spool_id,)))
+
+    def find_spool(self, name):
+        """Id of the newest active spool with this name, or None."""
+        row = self._run(lambda conn: conn.execute(
+            "SELECT id FROM spools WHERE name = ? AND active = 1 ORDER BY id DESC LIMIT 1",
+            (name,)).fetchone())
+        return row[0] if row else None
+
+    def set_balance(self, spool_id, grams, job=None):
+        """Record a manual correction that brings the balance to grams."""
+        self._run(lambda conn: adjust_balance(conn, spool_id, grams, job))
+
+    def deduct(self, usages, job=None):
+        """Record a print using grams from spools, given as (spool_id, grams) pairs.
+
+        All usages are written in one transaction; nothing is recorded if
+        any spool is unknown or would go below zero.
+        """
+        self._run(lambda conn: deduct_usages(conn, usages, job))
+
+    def record_print(self, spools, job=None):
+        """Bring the app's spools in line with the inventory and deduct a print.
+
+        spools is a list of (spool_id, name, material, cost, spool_weight,
+        grams, used). A spool_id of None registers a new spool holding grams;
+        otherwise the spool's details are updated and a balance that differs
+        from grams is recorded as a correction before used is deducted.
+        Everything happens in one transaction, so nothing is written when any
+        step fails. Returns the spool ids, in order, and {spool_id: grams left}.
+        """
+        def record(conn):
+            stock = {row[0]: row[1:] for row in conn.execute(
+                "SELECT s.id, s.name, s.material, s.cost, s.spool_weight, COALESCE(b.grams, 0) "
+                "FROM spools s LEFT JOIN balances b ON b.spool_id = s.id")}
+            ids = []
+            for spool_id, name, material, cost, spool_weight, grams, _ in spools:
+                row = stock.get(spool_id)
+                if spool_id is None:
+                    spool_id = insert_spool(conn, name, material, cost, grams, spool_weight)
+                elif row is None:
+                    raise InventoryError(f"Unknown spool {spool_id}")
+                else:
+                    if row[:4] != (name, material, cost, spool_weight):
+                        conn.execute("UPDATE spools SET name = ?, material = ?, cost = ?, spool_weight = ? "
+                                     "WHERE id = ?", (name, material, cost, spool_weight, spool_id))
+                    if abs(row[4] - grams) > 0.005:
+                        adjust_balance(conn, spool_id, grams)
+                ids.append(spool_id)
+            deduct_usages(conn, [(spool_id, spool[6]) for spool_id, spool in zip(ids, spools) if spool[6] > 0],
+                          job)
+            return ids, dict(conn.execute("SELECT spool_id, grams FROM balances"))
+        return self._run(record)
+
+    def spools(self, active=True):
+        """[(id, name, material, cost, spool_weight, remaining_grams)] in creation order."""
+        return self._run(lambda conn: conn.execute(
+            "SELECT s.id, s.name, s.material, s.cost, s.spool_weight, COALESCE(b.grams, 0) "
+            "FROM spools s LEFT JOIN balances b ON b.spool_id = s.id "
+            "WHERE s.active = ? ORDER BY s.id", (int(active),)).fetchall())
+
+    def balance(self, spool_id):
+        row = self._run(lambda conn: conn.execute(
+            "SELECT grams FROM balances WHERE spool_id = ?", (spool_id,)).fetchone())
+        return row[0] if row else 0.0
+
+    def remaining_by_material(self):
+        """[(material, grams, spool_count)] over the active spools."""
+        return self._run(lambda conn: conn.execute(
+            "SELECT s.material, SUM(b.grams), COUNT(*) FROM spools s "
+            "JOIN balances b ON b.spool_id = s.id WHERE s.active = 1 "
+            "GROUP BY s.material ORDER BY s.material").fetchall())
+
+    def cost_consumed(self, since, until=None):
+        """(grams, cost) deducted by prints between two timestamps."""
+        until = time.time() if until is None else until
+        return self._run(lambda conn: conn.execute(
+            "SELECT COALESCE(-SUM(grams), 0), COALESCE(SUM(cost), 0) FROM events "
+            "WHERE ts >= ? AND ts < ? AND kind = 'deduct'", (since, until)).fetchone())
+
+    def cost_this_month(self):
+        return self.cost_consumed(month_start())
+
+    def history(self, limit=50, spool_id=None):
+        """Newest events first: (ts, spool name, kind, grams, cost, job)."""
+        query = ("SELECT e.ts, s.name, e.kind, e.grams, e.cost, e.job FROM events e "
+                 "JOIN spools s ON s.id = e.spool_id ")
+        args = []
+        if spool_id is not None:
+            query += "WHERE e.spool_id = ? "
+            args.append(spool_id)
+        query += "ORDER BY e.ts DESC, e.id DESC LIMIT ?"
+        args.append(limit)
+        return self._run(lambda conn: conn.execute(query, args).fetchall())
+
+
+def main(argv=None):
+    # Only the command line needs argparse; the app imports this module at startup
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m inventory",
+                                     description="Report remaining filament and this month's filament cost.")
+    parser.add_argument('--history', type=int, metavar='N', help="show the latest N ledger events instead")
+    parser.add_argument('--db', help="inventory database (default: the desktop app's)")
+    args = parser.parse_args(argv)
+    inventory = Inventory(args.db)
+
+    if args.history:
+        for ts, name, kind, grams, cost, job in inventory.history(args.history):
+            when = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M")
+            print(f"{when}  {name:<20} {kind:<7} {grams:>10.1f}g  ${cost:>8.2f}  {job or ''}")
+        return 0
+
+    print(f"{'Material':<14} {'Spools':>6} {'Remaining':>12}")
+    for material, grams, count in inventory.remaining_by_material():
+        print(f"{material:<14} {count:>6} {grams:>11.1f}g")
+    grams, cost = inventory.cost_this_month()
+    print(f"\nUsed this month: {grams:.1f}g, ${cost:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
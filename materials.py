@@ -0,0 +1,56 @@
+"""Filament material registry.
+
+Each material carries its filament diameter, density and the net weight of
+a standard spool, plus a typical price used as the default spool cost.
+The mm -> grams conversion factor is computed once when the registry is
+built, so converting millions of jobs is a single division each.
+"""
+from dataclasses import dataclass
+import math
+
+
+@dataclass(frozen=True)
+class Material:
+    name: str
+    diameter: float        # mm
+    density: float         # g/cm3
+    spool_weight: float    # net grams of filament on a full spool
+    cost_per_gram: float   # $/g, default price for new spools
+    grams_per_mm: float
+    mm_per_gram: float
+
+    @property
+    def spool_cost(self):
+        """Default price of a full spool."""
+        return round(self.cost_per_gram * self.spool_weight, 2)
+
+
+def make_material(name, diameter, density, spool_weight=1000.0, cost_per_gram=0.025):
+    # Cross-section in mm2 times density in g/cm3 gives mg per mm of filament
+    grams_per_mm = math.pi * (diameter / 2) ** 2 * density / 1000.0
+    return Material(name, diameter, density, spool_weight, cost_per_gram,
+                    grams_per_mm, 1.0 / grams_per_mm)
+
+
+MATERIALS = {material.name: material for material in [
+    make_material("PLA", 1.75, 1.24, 1000.0, 0.025),
+    make_material("PETG", 1.75, 1.27, 1000.0, 0.025),
+    make_material("ABS", 1.75, 1.04, 1000.0, 0.022),
+    make_material("ASA", 1.75, 1.07, 1000.0, 0.030),
+    make_material("TPU", 1.75, 1.21, 500.0, 0.050),
+    make_material("PC", 1.75, 1.20, 1000.0, 0.045),
+    make_material("Nylon", 1.75, 1.14, 1000.0, 0.060),
+    make_material("PLA-CF", 1.75, 1.29, 1000.0, 0.040),
+    make_material("HIPS", 1.75, 1.04, 1000.0, 0.025),
+    make_material("PVA", 1.75, 1.23, 500.0, 0.090),
+    make_material("PLA 2.85mm", 2.85, 1.24, 1000.0, 0.025),
+    make_material("PETG 2.85mm", 2.85, 1.27, 1000.0, 0.025),
+    make_material("ABS 2.85mm", 2.85, 1.04, 1000.0, 0.022),
+]}
+
+DEFAULT_MATERIAL = "PLA"
+
+
+def get_material(name):
+    """Look up a material by name, falling back to PLA for unknown names."""
+    return MATERIALS.get(name) or MATERIALS[DEFAULT_MATERIAL]
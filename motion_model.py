@@ -0,0 +1,421 @@
+"""Print time estimate from the toolpath, for files without a slicer time.
+
+Moves are collected into column arrays (dx, dy, dz, de, feedrate,
+acceleration, junction deviation) and each batch is timed in one go with a
+trapezoidal velocity profile. Corner speeds follow the junction deviation
+model of Marlin and Klipper, and the planner's forward and backward passes
+are written as cumulative minimums so that NumPy can run them over the
+whole batch. Without NumPy the same math runs as plain loops.
+
+Firmware limits start at typical Marlin defaults and follow the M201,
+M203, M204 and M205 commands found in the file.
+"""
+from array import array
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Moves timed per batch; one move is always held back to plan its entry corner
+BATCH_SIZE = 1 << 16
+
+# Feedrate before the first F word, mm/s
+DEFAULT_FEEDRATE = 25.0
+# cos(theta) beyond which a corner counts as a full reversal or a straight line
+COS_LIMIT = 0.999999
+
+COLUMNS = ('dx', 'dy', 'dz', 'de', 'speed', 'accel', 'jd')
+AXES = b'XYZE'
+MOVE_COMMANDS = (b'G1', b'G0', b'G01', b'G00')
+# Arc command -> clockwise
+ARC_COMMANDS = {b'G2': True, b'G02': True, b'G3': False, b'G03': False}
+# First byte of a move word -> X, Y, Z, E, F, I, J
+WORD_INDEX = {ord(letter): index for index, letters in enumerate(['Xx', 'Yy', 'Zz', 'Ee', 'Ff', 'Ii', 'Jj'])
+              for letter in letters}
+
+
+class MachineLimits:
+    """Firmware motion limits; speeds in mm/s, accelerations in mm/s2."""
+
+    def __init__(self):
+        self.max_feedrate = [500.0, 500.0, 12.0, 120.0]          # M203 X Y Z E
+        self.max_acceleration = [3000.0, 3000.0, 100.0, 10000.0]  # M201 X Y Z E
+        self.acceleration = 1250.0                                # M204 P (or S)
+        self.travel_acceleration = 1250.0                         # M204 T (or S)
+        self.retract_acceleration = 1250.0                        # M204 R
+        self.junction_deviation = 0.013                           # M205 J
+        # Classic jerk (M205 X/Y) is converted to a junction deviation
+        self.jerk = None
+
+    def deviation(self, acceleration):
+        if self.jerk is not None:
+            return 0.4 * self.jerk * self.jerk / acceleration
+        return self.junction_deviation
+
+
+def axis_limit(limit, dist, delta):
+    """Largest value along the move that keeps one axis within its own limit."""
+    delta = abs(delta)
+    return limit * dist / delta if delta else math.inf
+
+
+def move_times_python(moves, n, entry, final, limits):
+    """Time of the first n moves of a batch; returns (seconds, exit speed squared).
+
+    Row n, when present, is the next move and only limits the exit corner.
+    """
+    m = min(len(moves['dx']), n + 1)
+    dist = []
+    speed = []
+    accel = []
+    units = []
+    for k in range(m):
+        dx, dy, dz, de = moves['dx'][k], moves['dy'][k], moves['dz'][k], moves['de'][k]
+        length = math.sqrt(dx * dx + dy * dy + dz * dz)
+        d = length or abs(de)
+        v = moves['speed'][k]
+        a = moves['accel'][k]
+        for axis, delta in enumerate((dx, dy, dz, de)):
+            v = min(v, axis_limit(limits.max_feedrate[axis], d, delta))
+            a = min(a, axis_limit(limits.max_acceleration[axis], d, delta))
+        dist.append(d)
+        speed.append(v * v)
+        accel.append(a)
+        units.append((dx / length, dy / length, dz / length) if length else None)
+
+    # Squared speed caps at every corner, corner k being the entry of move k
+    caps = [entry]
+    for k in range(1, m):
+        prev, unit = units[k - 1], units[k]
+        if prev is None or unit is None:
+            caps.append(0.0)
+            continue
+        cos_theta = -(prev[0] * unit[0] + prev[1] * unit[1] + prev[2] * unit[2])
+        if cos_theta > COS_LIMIT:
+            caps.append(0.0)
+            continue
+        sin_half = math.sqrt(0.5 * (1.0 - max(cos_theta, -COS_LIMIT)))
+        corner = accel[k] * moves['jd'][k] * sin_half / (1.0 - sin_half)
+        caps.append(min(corner, speed[k - 1], speed[k]))
+    if final or m == n:
+        caps = caps[:n] + [0.0]
+    else:
+        # The next move must be able to stop within itself, whatever follows
+        caps[n] = min(caps[n], 2 * accel[n] * dist[n])
+
+    # Forward pass: each move can only speed up by 2ad
+    for k in range(n):
+        caps[k + 1] = min(caps[k + 1], caps[k] + 2 * accel[k] * dist[k])
+    # Backward pass: and only slow down by as much
+    for k in range(n - 1, -1, -1):
+        caps[k] = min(caps[k], caps[k + 1] + 2 * accel[k] * dist[k])
+
+    total = 0.0
+    for k in range(n):
+        w0, w1, a, d = caps[k], caps[k + 1], accel[k], dist[k]
+        peak = max(min(speed[k], (2 * a * d + w0 + w1) / 2), w0, w1)
+        total += trapezoid_time(w0, w1, peak, a, d)
+    return total, caps[n]
+
+
+def trapezoid_time(w0, w1, peak, a, d):
+    """Seconds to cover d mm from speed sqrt(w0) to sqrt(w1) through sqrt(peak)."""
+    v0, v1, vp = math.sqrt(w0), math.sqrt(w1), math.sqrt(peak)
+    cruise = max(d - (peak - w0) / (2 * a) - (peak - w1) / (2 * a), 0.0)
+    return (vp - v0) / a + (vp - v1) / a + cruise / vp
+
+
+def move_times_numpy(moves, n, entry, final, limits):
+    """Vectorized move_times_python."""
+    m = min(len(moves['dx']), n + 1)
+    cols = {name: np.frombuffer(moves[name], dtype=float)[:m] for name in COLUMNS}
+    deltas = [cols['dx'], cols['dy'], cols['dz'], cols['de']]
+    length = np.sqrt(cols['dx'] ** 2 + cols['dy'] ** 2 + cols['dz'] ** 2)
+    dist = np.where(length > 0, length, np.abs(cols['de']))
+    speed = cols['speed'].copy()
+    accel = cols['accel'].copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for axis, delta in enumerate(deltas):
+            scale = np.where(delta != 0, dist / np.abs(delta), np.inf)
+            np.minimum(speed, limits.max_feedrate[axis] * scale, out=speed)
+            np.minimum(accel, limits.max_acceleration[axis] * scale, out=accel)
+        units = [np.where(length > 0, delta / length, 0.0) for delta in deltas[:3]]
+    speed *= speed
+
+    caps = np.empty(n + 1)
+    caps[0] = entry
+    if m > 1:
+        cos_theta = -(units[0][:-1] * units[0][1:] + units[1][:-1] * units[1][1:]
+                      + units[2][:-1] * units[2][1:])
+        sin_half = np.sqrt(0.5 * (1.0 - np.maximum(cos_theta, -COS_LIMIT)))
+        corner = accel[1:] * cols['jd'][1:] * sin_half / (1.0 - sin_half)
+        corner = np.minimum(corner, np.minimum(speed[:-1], speed[1:]))
+        corner[(cos_theta > COS_LIMIT) | (length[:-1] == 0) | (length[1:] == 0)] = 0.0
+        caps[1:m] = corner
+    if final or m == n:
+        caps[n] = 0.0
+    else:
+        caps[n] = min(caps[n], 2 * accel[n] * dist[n])
+
+    # Both passes are min-plus recurrences, i.e. cumulative minimums against
+    # the running sum of 2ad
+    gain = 2 * accel[:n] * dist[:n]
+    reach = np.concatenate(([0.0], np.cumsum(gain)))
+    forward = reach + np.minimum.accumulate(caps - reach)
+    caps = np.maximum(np.minimum.accumulate((forward + reach)[::-1])[::-1] - reach, 0.0)
+
+    w0, w1, a, d = caps[:-1], caps[1:], accel[:n], dist[:n]
+    peak = np.maximum(np.minimum(speed[:n], (gain + w0 + w1) / 2), np.maximum(w0, w1))
+    vp = np.sqrt(peak)
+    cruise = np.maximum(d - (peak - w0) / (2 * a) - (peak - w1) / (2 * a), 0.0)
+    times = (vp - np.sqrt(w0)) / a + (vp - np.sqrt(w1)) / a + cruise / vp
+    return float(times.sum()), float(caps[n])
+
+
+class MotionEstimator:
+    """Incremental time estimator fed with raw bytes, like GCodeParser."""
+
+    def __init__(self, limits=None, batch_size=BATCH_SIZE, vectorized=None):
+        self.limits = limits or MachineLimits()
+        self.batch_size = batch_size
+        if vectorized is None:
+            vectorized = np is not None
+        self.move_times = move_times_numpy if vectorized else move_times_python
+        self.moves = {name: array('d') for name in COLUMNS}
+        self.position = [0.0, 0.0, 0.0, 0.0]
+        self.absolute = True
+        self.absolute_e = True
+        self.feedrate = DEFAULT_FEEDRATE
+        self.entry = 0.0
+        self.seconds = 0.0
+        self.dwell = 0.0
+        self.move_count = 0
+        self.update_profiles()
+        self._pending = b''
+
+    def feed(self, chunk):
+        lines = (self._pending + chunk).split(b'\n')
+        self._pending = lines.pop()
+        self.feed_lines(lines)
+
+    def finish(self):
+        """Total estimated seconds, including dwells."""
+        if self._pending:
+            self.feed_lines([self._pending])
+            self._pending = b''
+        self.flush(final=True)
+        return self.seconds + self.dwell
+
+    def flush(self, final=False):
+        """Time every complete move in the batch; the last one waits unless final."""
+        count = len(self.moves['dx'])
+        n = count if final else count - 1
+        if n <= 0:
+            return
+        seconds, self.entry = self.move_times(self.moves, n, self.entry, final, self.limits)
+        self.seconds += seconds
+        for column in self.moves.values():
+            del column[:n]
+
+    def update_profiles(self):
+        """(acceleration, junction deviation) of extruding, travel and retract moves."""
+        limits = self.limits
+        self.profiles = [(accel, limits.deviation(accel)) for accel in
+                         (limits.acceleration, limits.travel_acceleration, limits.retract_acceleration)]
+
+    def feed_lines(self, lines):
+        """Tokenize complete lines (bytes, without the newline).
+
+        Moves are appended straight to the column arrays; everything else is
+        rare enough to go through the slower branches.
+        """
+        position = self.position
+        moves = self.moves
+        append_dx, append_dy, append_dz, append_de, append_speed, append_accel, append_jd = (
+            moves[name].append for name in COLUMNS)
+        batch_size = self.batch_size
+        feedrate = self.feedrate
+        absolute = self.absolute
+        absolute_e = self.absolute_e
+        profiles = self.profiles
+        queued = len(moves['dx'])
+        count = 0
+
+        for line in lines:
+            comment = line.find(b';')
+            if comment >= 0:
+                line = line[:comment]
+            words = line.split()
+            if not words:
+                continue
+            command = words[0].upper()
+            if command[:1] == b'N':
+                # Line number and checksum of G-code written for a host
+                words = line.split(b'*')[0].split()[1:]
+                if not words:
+                    continue
+                command = words[0].upper()
+
+            if command in MOVE_COMMANDS or command in ARC_COMMANDS:
+                target = position[:]
+                center = [0.0, 0.0]
+                for word in words[1:]:
+                    axis = WORD_INDEX.get(word[0], -1)
+                    if axis < 0:
+                        continue
+                    try:
+                        value = float(word[1:])
+                    except ValueError:
+                        continue
+                    if axis == 3:
+                        target[3] = value if absolute_e else position[3] + value
+                    elif axis < 3:
+                        target[axis] = value if absolute else position[axis] + value
+                    elif axis == 4:
+                        if value > 0:
+                            feedrate = value / 60.0
+                    else:
+                        center[axis - 5] = value
+                dx = target[0] - position[0]
+                dy = target[1] - position[1]
+                dz = target[2] - position[2]
+                de = target[3] - position[3]
+                if not (dx or dy or dz or de):
+                    position = target
+                    continue
+                clockwise = ARC_COMMANDS.get(command)
+                if clockwise is not None:
+                    dx, dy = arc_delta(position, dx, dy, center, clockwise)
+                position = target
+                if dx or dy or dz:
+                    accel, jd = profiles[0 if de > 0 else 1]
+                else:
+                    accel, jd = profiles[2]
+                append_dx(dx)
+                append_dy(dy)
+                append_dz(dz)
+                append_de(de)
+                append_speed(feedrate)
+                append_accel(accel)
+                append_jd(jd)
+                count += 1
+                queued += 1
+                if queued > batch_size:
+                    self.flush()
+                    queued = len(moves['dx'])
+                continue
+
+            # Rare commands work on the instance state
+            self.position = position
+            self.feedrate = feedrate
+            self.absolute = absolute
+            self.absolute_e = absolute_e
+            self.feed_command(command, words)
+            position = self.position
+            absolute = self.absolute
+            absolute_e = self.absolute_e
+            profiles = self.profiles
+            queued = len(moves['dx'])
+
+        self.position = position
+        self.feedrate = feedrate
+        self.absolute = absolute
+        self.absolute_e = absolute_e
+        self.move_count += count
+
+    def feed_command(self, command, words):
+        position = self.position
+        if command == b'G4':
+            for word in words[1:]:
+                try:
+                    value = float(word[1:])
+                except ValueError:
+                    continue
+                if word[:1] in (b'P', b'p'):
+                    self.dwell += value / 1000.0
+                elif word[:1] in (b'S', b's'):
+                    self.dwell += value
+
+        elif command == b'G90':
+            self.absolute = self.absolute_e = True
+        elif command == b'G91':
+            self.absolute = self.absolute_e = False
+        elif command == b'M82':
+            self.absolute_e = True
+        elif command == b'M83':
+            self.absolute_e = False
+
+        elif command in (b'G92', b'G28'):
+            axes = [(AXES.find(word[:1].upper()), word[1:]) for word in words[1:]]
+            axes = [(axis, value) for axis, value in axes if axis >= 0]
+            if not axes:
+                axes = [(axis, b'0') for axis in range(4 if command == b'G92' else 3)]
+            for axis, value in axes:
+                try:
+                    position[axis] = float(value or 0) if command == b'G92' else 0.0
+                except ValueError:
+                    continue
+
+        elif command in (b'M201', b'M203', b'M204', b'M205'):
+            self.set_limits(command, words[1:])
+
+    def set_limits(self, command, words):
+        # Moves already queued are timed under the limits they were issued with
+        self.flush()
+        limits = self.limits
+        for word in words:
+            letter = word[:1].upper()
+            try:
+                value = float(word[1:])
+            except ValueError:
+                continue
+            if value <= 0:
+                continue
+            axis = AXES.find(letter)
+            if command == b'M201' and axis >= 0:
+                limits.max_acceleration[axis] = value
+            elif command == b'M203' and axis >= 0:
+                limits.max_feedrate[axis] = value
+            elif command == b'M204':
+                if letter in (b'S', b'P'):
+                    limits.acceleration = value
+                if letter in (b'S', b'T'):
+                    limits.travel_acceleration = value
+                if letter == b'R':
+                    limits.retract_acceleration = value
+            elif command == b'M205':
+                if letter == b'J':
+                    limits.junction_deviation = value
+                    limits.jerk = None
+                elif letter in (b'X', b'Y'):
+                    limits.jerk = value
+        self.update_profiles()
+
+
+def arc_delta(position, dx, dy, center, clockwise):
+    """XY delta of a G2/G3 arc stretched to the arc length, along its chord."""
+    cx, cy = position[0] + center[0], position[1] + center[1]
+    radius = math.hypot(center[0], center[1])
+    if not radius:
+        return dx, dy
+    start = math.atan2(position[1] - cy, position[0] - cx)
+    end = math.atan2(position[1] + dy - cy, position[0] + dx - cx)
+    sweep = end - start
+    if clockwise and sweep >= 0:
+        sweep -= 2 * math.pi
+    elif not clockwise and sweep <= 0:
+        sweep += 2 * math.pi
+    arc = abs(sweep) * radius
+    chord = math.hypot(dx, dy)
+    if not chord:
+        return arc, 0.0
+    return dx * arc / chord, dy * arc / chord
+
+
+def estimate_lines(lines, limits=None, vectorized=None):
+    """Estimated seconds for an iterable of G-code lines (bytes)."""
+    estimator = MotionEstimator(limits, vectorized=vectorized)
+    estimator.feed_lines(lines)
+    return estimator.finish()
@@ -0,0 +1,134 @@
+"""On-disk cache of G-code parse results.
+
+Results are stored in a small SQLite database under the user config
+directory, keyed by a cheap content fingerprint so that re-loading the
+same sliced file skips parsing entirely. The parser itself is only
+imported once a result is read or written.
+"""
+from dataclasses import asdict
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from app_dirs import config_dir
+
+CACHE_FILE_NAME = "parse_cache.sqlite3"
+# Entries kept before the least recently used ones are evicted
+MAX_ENTRIES = 2000
+# Size of each block hashed for the fingerprint
+SAMPLE_SIZE = 64 << 10
+
+
+def fingerprint(file_path, member=None):
+    """Size, mtime and a hash of the first, middle and last blocks of a file.
+
+    member names the G-code entry inside a .gcode.3mf so that the plates of
+    one project get separate keys.
+    """
+    stat = os.stat(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for offset in (0, stat.st_size // 2, stat.st_size - SAMPLE_SIZE):
+            f.seek(max(offset, 0))
+            digest.update(f.read(SAMPLE_SIZE))
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{digest.hexdigest()}:{member or ''}"
+
+
+class ParseCache:
+    """LRU store of ParseResult records.
+
+    A new connection is opened for every call so the cache can be used from
+    the GUI thread and the parse worker alike.
+    """
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES, version=None):
+        self.path = path or os.path.join(config_dir(), CACHE_FILE_NAME)
+        self.max_entries = max_entries
+        # Defaults to gcode_parser.PARSER_VERSION, looked up on first use
+        self.version = version
+        self._ready = False
+
+    def _connect(self):
+        if self._ready:
+            return sqlite3.connect(self.path)
+
+        if self.version is None:
+            import gcode_parser
+            self.version = gcode_parser.PARSER_VERSION
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries ("
+                         "key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            row = conn.execute("SELECT value FROM meta WHERE key = 'parser_version'").fetchone()
+            if row is None or row[0] != str(self.version):
+                # Results from another parser version may differ, drop them all
+                conn.execute("DELETE FROM entries")
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('parser_version', ?)", (str(self.version),))
+        self._ready = True
+        return conn
+
+    def get(self, file_path, member=None):
+        """Return the cached ParseResult for a file, or None."""
+        key = fingerprint(file_path, member)
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT result FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        finally:
+            conn.close()
+        import gcode_parser
+        return gcode_parser.ParseResult.from_dict(json.loads(row[0]))
+
+    def put(self, file_path, result, member=None):
+        key = fingerprint(file_path, member)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                             (key, json.dumps(asdict(result)), time.time()))
+                conn.execute("DELETE FROM entries WHERE key IN ("
+                             "SELECT key FROM entries ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                             (self.max_entries,))
+        finally:
+            conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM entries")
+        finally:
+            conn.close()
+
+
+def cached_parse(file_path, cache=None, **kwargs):
+    """parse_file with a ParseCache in front; kwargs go to parse_file.
+
+    A cache that cannot be opened, read or written (an SQLite or file system
+    error, e.g. an unusable config directory) is skipped, so it only ever
+    costs a parse and never loses a result.
+    """
+    import gcode_parser
+    cache = cache or ParseCache()
+    try:
+        result = cache.get(file_path)
+    except (sqlite3.Error, OSError):
+        cache = None
+        result = None
+    # Results cached without a scan have no layer and feature buckets
+    if result is None or (kwargs.get('breakdown') and not result.has_breakdown()):
+        result = gcode_parser.parse_file(file_path, **kwargs)
+        if cache is not None:
+            try:
+                cache.put(file_path, result)
+            except (sqlite3.Error, OSError):
+                pass
+    return result
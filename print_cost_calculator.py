@@ -1,13 +1,36 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from tkinter import messagebox, filedialog
-import json
+import csv
+import itertools
+import os
 from pathlib import Path
-import re
-import zipfile
+import queue
+import sqlite3
+import threading
+import cost_engine
+import inventory
+import materials
+import profiling
+import spools
+# gcode_parser, parse_cache and json are imported when first needed, so the
+# parser, zipfile and NumPy stay out of startup
+
+# Quiet period after the last edit before the results are refreshed
+RECALC_DELAY_MS = 150
+
+# Spool table columns: heading and initial width
+SPOOL_HEADINGS = {
+    'name': ("Name/Color", 140),
+    'material': ("Material", 90),
+    'cost': ("Spool Cost ($)", 95),
+    'weight': ("Remaining (g)", 95),
+    'used': ("Used (g)", 70),
+    'print_cost': ("Print Cost ($)", 90),
+}
 
 class PrintCostCalculator:
-    def __init__(self, root):
+    def __init__(self, root, trace=None, status_bar=False):
         self.root = root
         self.root.title("3D Print Cost Calculator")
         self.root.geometry("650x800")
@@ -15,6 +38,29 @@ class PrintCostCalculator:
         # G-code parsing results
         self.gcode_time_seconds = None
         self.gcode_filament_mm = None
+        self.gcode_file = None
+        # Last ParseResult; CSV exports add its layer and feature breakdown
+        self.gcode_result = None
+        
+        # Spool stock and the ledger of every deduction
+        self.inventory = inventory.Inventory()
+        
+        # Background G-code parse state
+        self.parse_thread = None
+        self.parse_cancel = None
+        self.parse_queue = None
+        self.parse_progress = ttk.DoubleVar(value=0)
+        self.parse_status = ttk.StringVar()
+        self.parse_cache = None
+        self.parse_profile = None
+        # CSV file waiting for a breakdown scan of the loaded G-code
+        self.parse_export = None
+        
+        # Opt-in timings of loads and calculations, written to a
+        # profiling.Trace and/or shown in a status bar
+        self.trace = trace
+        self.profiling = trace is not None or status_bar
+        self.profile_status = ttk.StringVar()
         
         # Configure style for consistent appearance
         self.style = ttk.Style()
@@ -28,6 +74,10 @@ class PrintCostCalculator:
         
         self.canvas.configure(yscrollcommand=self.scrollbar.set)
         
+        # Packed first so the canvas cannot squeeze it out
+        if status_bar:
+            ttk.Label(root, textvariable=self.profile_status, anchor="w", padding=(10, 2),
+                     bootstyle="secondary").pack(side="bottom", fill="x")
         self.scrollbar.pack(side="right", fill="y")
         self.canvas.pack(side="left", fill="both", expand=True)
         self.canvas_frame = self.canvas.create_window((0, 0), window=self.main_frame, anchor="nw")
@@ -41,16 +91,48 @@ class PrintCostCalculator:
         self.print_time = ttk.StringVar(value="4.5")
         self.num_items = ttk.StringVar(value="1")
         
-        # List to store filament spool frames
-        self.spool_frames = []
+        # Spool rows by table item id, in table order; the table is built
+        # with the secondary widgets
+        self.spools = {}
+        self.spool_keys = itertools.count()
+        self.spool_table = None
+        self.spool_editor = None
         
         # Result variables
         self.power_cost_result = ttk.StringVar()
         self.filament_cost_result = ttk.StringVar()
         self.total_cost_result = ttk.StringVar()
         self.cost_per_item_result = ttk.StringVar()
-        
+        self.calc_status = ttk.StringVar()
+        
+        # Live results: edits mark their cost term dirty and a debounced
+        # recalculate() refreshes only those terms
+        self.cost_model = cost_engine.CostModel()
+        self.inputs = {
+            'rate': (self.power_cost, "Power Cost"),
+            'power_usage': (self.power_usage, "Power Usage"),
+            'print_time': (self.print_time, "Print Time"),
+            'num_items': (self.num_items, "Number of Items"),
+        }
+        self.dirty = set()
+        self.invalid = {}
+        self.recalc_job = None
+        for name, (var, _) in self.inputs.items():
+            var.trace_add("write", lambda *args, name=name: self.mark_dirty(name))
+            self.mark_dirty(name)
+        
+        # Only the main inputs are built before the window first appears
+        self.map_seen = False
+        self.widgets_ready = False
         self.create_widgets()
+        self.root.bind("<Map>", self.on_first_map, add="+")
+        
+    def on_first_map(self, event):
+        if event.widget is not self.root or self.map_seen:
+            return
+        self.map_seen = True
+        # Queued behind the first paint of the window
+        self.root.after_idle(self.create_secondary_widgets)
         
     def on_frame_configure(self, event=None):
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
@@ -58,49 +140,137 @@ class PrintCostCalculator:
     def on_canvas_configure(self, event):
         self.canvas.itemconfig(self.canvas_frame, width=event.width)
         
-    def create_spool_frame(self):
-        frame = ttk.LabelFrame(self.main_frame, text=f"Filament Spool {len(self.spool_frames) + 1}",
-                             padding=10, bootstyle="secondary")
-        frame.grid(row=len(self.spool_frames) + 4, column=0, columnspan=2, sticky="ew", pady=5)
-        
-        spool_data = {
-            'name': ttk.StringVar(value=f"Spool {len(self.spool_frames) + 1}"),
-            'cost': ttk.StringVar(value="25.00"),
-            'weight': ttk.StringVar(value="1000"),
-            'used': ttk.StringVar(value="75")
-        }
-        
-        # Spool input fields with consistent padding
-        ttk.Label(frame, text="Name/Color:").grid(row=0, column=0, sticky="w", pady=2)
-        ttk.Entry(frame, textvariable=spool_data['name']).grid(row=0, column=1, sticky="ew", pady=2, padx=(5, 10))
-        
-        ttk.Label(frame, text="Spool Cost ($):").grid(row=0, column=2, sticky="w", pady=2)
-        ttk.Entry(frame, textvariable=spool_data['cost']).grid(row=0, column=3, sticky="ew", pady=2, padx=5)
-        
-        ttk.Label(frame, text="Total Weight (g):").grid(row=1, column=0, sticky="w", pady=2)
-        ttk.Entry(frame, textvariable=spool_data['weight']).grid(row=1, column=1, sticky="ew", pady=2, padx=(5, 10))
+    def add_spool(self, record=None):
+        """Append a spool row; without a record a default spool is added.
         
-        ttk.Label(frame, text="Used Weight (g):").grid(row=1, column=2, sticky="w", pady=2)
-        ttk.Entry(frame, textvariable=spool_data['used']).grid(row=1, column=3, sticky="ew", pady=2, padx=5)
-        
-        # Remove button with warning style
-        ttk.Button(frame, text="Remove", command=lambda f=frame: self.remove_spool(f),
-                  bootstyle="danger-outline").grid(row=0, column=4, rowspan=2, padx=10)
-        
-        self.spool_frames.append({'frame': frame, 'data': spool_data})
-        self.on_frame_configure()
+        The row is not inventory stock unless the record has a spool_id.
+        """
+        if self.spool_table is None:
+            return None
+        record = record or self.default_spool()
+        self.insert_spools([record])
+        return record
+        
+    def default_spool(self):
+        """A new default record named "Spool N" after the rows already in the table."""
+        names = {row.name for row in self.spools.values()}
+        number = next(n for n in itertools.count(len(self.spools) + 1) if f"Spool {n}" not in names)
+        return spools.SpoolRecord(next(self.spool_keys), f"Spool {number}")
+        
+    def add_stock_spool(self):
+        """Add Filament Spool: a default spool, registered in the inventory right away."""
+        if self.spool_table is None:
+            return
+        record = self.default_spool()
+        material = materials.get_material(record.material)
+        try:
+            record.spool_id = self.inventory.add_spool(record.name, material.name, record.cost, record.weight,
+                                                       material.spool_weight)
+        except (sqlite3.Error, OSError) as e:
+            messagebox.showerror("Error", f"Failed to update the inventory: {str(e)}")
+            return
+        self.add_spool(record)
+        
+    def insert_spools(self, records):
+        """Add rows to the spool table in one pass and one recalculation."""
+        for record in records:
+            iid = str(record.key)
+            self.spools[iid] = record
+            self.cost_model.set_spool(record.key, record.cost, record.used, record.spool_weight)
+            self.spool_table.insert("", "end", iid=iid, values=record.row(self.cost_model.spool_costs[record.key]))
+        self.mark_dirty('spools')
+        
+    def refresh_spool(self, record):
+        """Push an edited record to the cost model and its table row."""
+        self.cost_model.set_spool(record.key, record.cost, record.used, record.spool_weight)
+        self.spool_table.item(str(record.key), values=record.row(self.cost_model.spool_costs[record.key]))
+        self.mark_dirty('spools')
+        
+    def remove_spools(self, iids, retire=True):
+        """Remove spool rows; with retire their inventory spools are retired too."""
+        self.close_spool_editor()
+        if not iids:
+            return
+        errors = []
+        for iid in iids:
+            record = self.spools.pop(iid)
+            if retire and record.spool_id is not None:
+                try:
+                    self.inventory.retire_spool(record.spool_id)
+                except sqlite3.Error as e:
+                    errors.append(str(e))
+            self.cost_model.remove_spool(record.key)
+        self.spool_table.delete(*iids)
+        self.mark_dirty('spools')
+        if errors:
+            messagebox.showerror("Error", f"Failed to update the inventory: {errors[0]}")
+            
+    def remove_selected_spools(self):
+        self.remove_spools(self.spool_table.selection())
+        
+    def edit_spool_cell(self, event):
+        """Open an editor over the double-clicked cell of the spool table."""
+        self.close_spool_editor(save=True)
+        iid = self.spool_table.identify_row(event.y)
+        column = self.spool_table.identify_column(event.x)
+        if not iid or not column:
+            return
+        field = spools.COLUMNS[int(column[1:]) - 1]
+        bbox = self.spool_table.bbox(iid, column)
+        if field == 'print_cost' or not bbox:
+            return
         
-    def remove_spool(self, frame):
-        for idx, spool_frame in enumerate(self.spool_frames):
-            if spool_frame['frame'] == frame:
-                frame.destroy()
-                self.spool_frames.pop(idx)
-                # Renumber remaining spool frames and update their styling
-                for i, sf in enumerate(self.spool_frames, 1):
-                    sf['frame'].configure(text=f"Filament Spool {i}")
-                    sf['frame'].configure(bootstyle="default")
-                break
-        self.on_frame_configure()
+        if field == 'material':
+            # No FocusOut here: opening the list takes the focus
+            editor = ttk.Combobox(self.spool_table, values=list(materials.MATERIALS), state="readonly")
+            editor.set(self.spools[iid].material)
+            editor.bind("<<ComboboxSelected>>", lambda event: self.close_spool_editor(save=True))
+        else:
+            editor = ttk.Entry(self.spool_table)
+            editor.insert(0, self.spool_table.set(iid, field))
+            editor.select_range(0, "end")
+            editor.bind("<FocusOut>", lambda event: self.close_spool_editor(save=True))
+        editor.bind("<Return>", lambda event: self.close_spool_editor(save=True))
+        editor.bind("<Escape>", lambda event: self.close_spool_editor())
+        x, y, width, height = bbox
+        editor.place(x=x, y=y, width=width, height=height)
+        editor.focus_set()
+        self.spool_editor = (editor, iid, field)
+        
+    def close_spool_editor(self, save=False):
+        if self.spool_editor is None:
+            return
+        editor, iid, field = self.spool_editor
+        # Cleared first: destroying the editor fires its FocusOut
+        self.spool_editor = None
+        text = editor.get().strip()
+        editor.destroy()
+        if save and iid in self.spools:
+            self.update_spool(self.spools[iid], field, text)
+            
+    def update_spool(self, record, field, text):
+        if field in spools.NUMBER_COLUMNS:
+            value = self.parse_number(text)
+            if value is None:
+                self.calc_status.set(f"Enter a valid number for {SPOOL_HEADINGS[field][0]} ({record.name})")
+                return
+            setattr(record, field, value)
+        elif field == 'material':
+            if text == record.material:
+                return
+            # Picking a material fills in its typical spool price, unless the
+            # row's price is no longer the previous material's default
+            if record.cost == materials.get_material(record.material).spool_cost:
+                record.cost = materials.get_material(text).spool_cost
+            record.material = text
+        else:
+            record.name = text
+        self.refresh_spool(record)
+        
+    def on_spool_scroll(self, first, last):
+        # An open editor would stay put while its row scrolls away
+        self.spool_scrollbar.set(first, last)
+        self.close_spool_editor(save=True)
     
     def create_widgets(self):
         # Title with improved styling
@@ -133,21 +303,68 @@ class PrintCostCalculator:
                   bootstyle="primary").grid(row=0, column=0, padx=5)
                   
         ttk.Button(button_frame, text="Add Filament Spool",
-                  command=self.create_spool_frame,
+                  command=self.add_stock_spool,
                   bootstyle="info").grid(row=0, column=1, padx=5)
                   
         ttk.Button(button_frame, text="Reset All",
                   command=self.reset_all,
                   bootstyle="warning").grid(row=0, column=2, padx=5)
-        
-        # Add initial spool frame
-        self.create_spool_frame()
+                  
+        ttk.Button(button_frame, text="Inventory",
+                  command=self.show_inventory,
+                  bootstyle="secondary").grid(row=0, column=3, padx=5)
+        self.button_frame = button_frame
+        
+    def create_secondary_widgets(self):
+        """Spools, actions and results, built once the window is on screen."""
+        # Parse progress, only visible while a G-code file is being parsed
+        self.progress_frame = ttk.Frame(self.button_frame)
+        self.progress_frame.grid(row=1, column=0, columnspan=4, sticky="ew", pady=(10, 0))
+        self.progress_frame.columnconfigure(0, weight=1)
+        
+        ttk.Label(self.progress_frame, textvariable=self.parse_status).grid(row=0, column=0, columnspan=2, sticky="w")
+        ttk.Progressbar(self.progress_frame, variable=self.parse_progress, maximum=100,
+                       bootstyle="info-striped").grid(row=1, column=0, sticky="ew", padx=(0, 5))
+        ttk.Button(self.progress_frame, text="Cancel",
+                  command=self.cancel_gcode_parse,
+                  bootstyle="danger-outline").grid(row=1, column=1)
+        self.progress_frame.grid_remove()
+        
+        # Spool table; the Treeview only draws the rows in view, so it stays
+        # responsive with hundreds of spools
+        spool_frame = ttk.LabelFrame(self.main_frame, text="Filament Spools",
+                                     padding=10, bootstyle="secondary")
+        spool_frame.grid(row=4, column=0, columnspan=2, sticky="ew", pady=5)
+        spool_frame.columnconfigure(0, weight=1)
+        
+        self.spool_table = ttk.Treeview(spool_frame, columns=spools.COLUMNS, show="headings",
+                                        height=8, selectmode="extended")
+        for column in spools.COLUMNS:
+            heading, width = SPOOL_HEADINGS[column]
+            self.spool_table.heading(column, text=heading)
+            self.spool_table.column(column, width=width, minwidth=50,
+                                    anchor="w" if column in ('name', 'material') else "e")
+        self.spool_scrollbar = ttk.Scrollbar(spool_frame, orient="vertical", command=self.spool_table.yview)
+        self.spool_table.configure(yscrollcommand=self.on_spool_scroll)
+        self.spool_table.grid(row=0, column=0, sticky="ew")
+        self.spool_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.spool_table.bind("<Double-1>", self.edit_spool_cell)
+        self.spool_table.bind("<Button-1>", lambda event: self.close_spool_editor(save=True))
+        self.spool_table.bind("<Delete>", lambda event: self.remove_selected_spools())
+        
+        ttk.Label(spool_frame, text="Double-click a cell to edit it.").grid(row=1, column=0, sticky="w", pady=(5, 0))
+        ttk.Button(spool_frame, text="Remove Selected",
+                  command=self.remove_selected_spools,
+                  bootstyle="danger-outline").grid(row=1, column=0, columnspan=2, sticky="e", pady=(5, 0))
+        
+        # Spools in stock, or an initial spool
+        self.load_inventory()
         
         # Action buttons with bootstrap styles
         action_frame = ttk.Frame(self.main_frame)
         action_frame.grid(row=98, column=0, columnspan=2, pady=20)
         
-        ttk.Button(action_frame, text="Calculate",
+        ttk.Button(action_frame, text="Deduct Used Filament",
                   command=self.calculate,
                   bootstyle="primary").grid(row=0, column=0, padx=5)
         ttk.Button(action_frame, text="Save Settings",
@@ -178,84 +395,144 @@ class PrintCostCalculator:
             ttk.Label(results_frame, textvariable=var,
                      bootstyle="primary").grid(row=i, column=1, sticky="w", pady=5, padx=5)
         
-    def validate_float(self, value, field_name):
+        # Input problems and confirmations, shown instead of dialogs
+        ttk.Label(results_frame, textvariable=self.calc_status,
+                 bootstyle="warning").grid(row=len(results), column=0, columnspan=2, sticky="w", pady=5, padx=5)
+        
+        self.widgets_ready = True
+        self.on_frame_configure()
+        
+    def mark_dirty(self, term):
+        """Queue a cost term for the next recalculation and restart the debounce timer."""
+        self.dirty.add(term)
+        if self.recalc_job is not None:
+            self.root.after_cancel(self.recalc_job)
+        self.recalc_job = self.root.after(RECALC_DELAY_MS, self.recalculate)
+    
+    def parse_number(self, text, integer=False):
+        """A number typed into a field, or None when it is invalid."""
         try:
-            return float(value)
+            value = int(text) if integer else float(text)
         except ValueError:
-            messagebox.showerror("Invalid Input", f"Please enter a valid number for {field_name}", icon="error")
             return None
-            
-    def calculate(self):
-        # Get and validate basic inputs
-        power_cost = self.validate_float(self.power_cost.get(), "Power Cost")
-        power_usage = self.validate_float(self.power_usage.get(), "Power Usage")
-        print_time = self.validate_float(self.print_time.get(), "Print Time")
-        num_items = self.validate_int(self.num_items.get(), "Number of Items")
+        if integer and value <= 0:
+            return None
+        return value
+    
+    def recalculate(self):
+        """Recompute the cost terms marked dirty and refresh the result labels."""
+        if self.recalc_job is not None:
+            self.root.after_cancel(self.recalc_job)
+            self.recalc_job = None
+        dirty, self.dirty = self.dirty, set()
+        
+        for term in dirty:
+            if term in self.inputs:
+                var, label = self.inputs[term]
+                value = self.parse_number(var.get(), integer=term == 'num_items')
+                if value is None:
+                    self.invalid[term] = f"Enter a valid number for {label}"
+                    continue
+                self.invalid.pop(term, None)
+                self.cost_model.set_input(term, value)
+            # Spool rows are validated as they are edited and already in the model
         
-        if None in (power_cost, power_usage, print_time, num_items):
+        if self.invalid:
+            # Keep the last valid results on screen until the input is fixed
+            self.calc_status.set(next(iter(self.invalid.values())))
             return
-
-        # Calculate power cost
-        power_cost_value = (power_usage / 1000) * print_time * power_cost
-        
-        # Calculate total filament cost and update weights
-        total_filament_cost = 0
-        filament_details = []
-        weight_updates = []
-        
-        for spool in self.spool_frames:
-            spool_data = spool['data']
-            name = spool_data['name'].get()
-            cost = self.validate_float(spool_data['cost'].get(), f"Spool Cost ({name})")
-            weight = self.validate_float(spool_data['weight'].get(), f"Total Weight ({name})")
-            used = self.validate_float(spool_data['used'].get(), f"Used Weight ({name})")
-            
-            if None in (cost, weight, used):
-                return
-            
+        self.calc_status.set("")
+        
+        # Per-spool costs are shown in the spool table
+        costs = self.cost_model.totals()
+        self.power_cost_result.set(f"${costs['power_cost']:.2f}")
+        self.filament_cost_result.set(f"${costs['filament_cost']:.2f}")
+        self.total_cost_result.set(f"${costs['total_cost']:.2f}")
+        self.cost_per_item_result.set(f"${costs['cost_per_item']:.2f}")
+    
+    def calculate(self):
+        """Deduct each spool's used filament from its remaining weight.
+        
+        The cost results themselves are kept current by recalculate().
+        """
+        profile = self.start_profile("calculate", spools=len(self.spools))
+        with profiling.phase(profile, 'validate'):
+            self.recalculate()
+        if self.invalid:
+            messagebox.showerror("Invalid Input", next(iter(self.invalid.values())), icon="error")
+            return
+        
+        for record in self.spools.values():
             # Safety check for used weight greater than remaining weight
-            if used > weight:
-                messagebox.showerror("Error", f"Used weight ({used}g) cannot be greater than remaining weight ({weight}g) for {name}")
+            if record.used > record.weight:
+                messagebox.showerror("Error", f"Used weight ({record.used}g) cannot be greater than "
+                                     f"remaining weight ({record.weight}g) for {record.name}")
                 return
-            
-            # Calculate cost based on simple cost per gram
-            cost_per_gram = cost / 1000.0  # Cost per gram based on standard 1kg spool
-            spool_cost = used * cost_per_gram  # Cost for grams used
-            total_filament_cost += spool_cost
-            filament_details.append(f"{name}: ${spool_cost:.2f}")
-            
-            # Update remaining weight
-            remaining_weight = max(weight - used, 0.0)
-            weight_updates.append((spool_data['weight'], remaining_weight))
-        
-        # Calculate total and per-item costs
-        total_cost = power_cost_value + total_filament_cost
-        cost_per_item = total_cost / num_items
-        
-        # Update result labels with formatted values
-        self.power_cost_result.set(f"${power_cost_value:.2f}")
-        self.filament_cost_result.set(f"${total_filament_cost:.2f}\n" + "\n".join(filament_details))
-        self.total_cost_result.set(f"${total_cost:.2f}")
-        self.cost_per_item_result.set(f"${cost_per_item:.2f}")
-        
-        # Update spool weights after successful calculation
-        for weight_var, new_weight in weight_updates:
-            weight_var.set(f"{new_weight:.2f}")
-        
-        # Show confirmation message
-        messagebox.showinfo("Weight Updated", "Used filament deducted from spools. Remember to save settings to preserve changes.")
         
-    def validate_int(self, value, field_name):
+        # Record the deduction in the inventory, then show the new balances
+        stocked = [record for record in self.spools.values() if record.spool_id is not None]
+        balances = {}
         try:
-            result = int(value)
-            if result <= 0:
-                messagebox.showerror("Invalid Input", f"{field_name} must be greater than 0", icon="error")
-                return None
-            return result
-        except ValueError:
-            messagebox.showerror("Invalid Input", f"Please enter a valid whole number for {field_name}", icon="error")
-            return None
-
+            with profiling.phase(profile, 'inventory'):
+                if stocked:
+                    _, balances = self.inventory.record_print(
+                        [self.inventory_spool(record) for record in stocked],
+                        job=Path(self.gcode_file).name if self.gcode_file else None)
+        except (inventory.InventoryError, sqlite3.Error) as e:
+            self.finish_profile(profile, "error")
+            messagebox.showerror("Error", f"Failed to update the inventory: {str(e)}")
+            return
+        # Remaining weight does not change the costs, so no recalculation
+        with profiling.phase(profile, 'ui update'):
+            for iid, record in self.spools.items():
+                if record.spool_id is None:
+                    record.weight -= record.used
+                else:
+                    record.weight = balances.get(record.spool_id, record.weight)
+                self.spool_table.item(iid, values=record.row(self.cost_model.spool_costs[record.key]))
+        
+        self.calc_status.set("Used filament deducted from spools and recorded in the inventory.")
+        self.finish_profile(profile)
+        
+    def inventory_spool(self, record):
+        """A table row as an Inventory.record_print entry.
+        
+        Rows are linked to the inventory only through their spool_id, never
+        by name, and only Add Filament Spool gives a row a new one; rows
+        without one are deducted in the table alone. A remaining weight typed
+        into the table is recorded as a correction.
+        """
+        material = materials.get_material(record.material)
+        return (record.spool_id, record.name, material.name, record.cost, material.spool_weight,
+                record.weight, record.used)
+    
+    def load_inventory(self):
+        """One spool row per active inventory spool, or a default spool."""
+        try:
+            stock = self.inventory.spools()
+        except (sqlite3.Error, OSError):
+            stock = []
+        records = [spools.SpoolRecord(next(self.spool_keys), name, material, cost, grams, used=0.0,
+                                      spool_id=spool_id)
+                   for spool_id, name, material, cost, _, grams in stock]
+        if records:
+            self.insert_spools(records)
+        else:
+            self.add_spool()
+    
+    def show_inventory(self):
+        try:
+            by_material = self.inventory.remaining_by_material()
+            grams, cost = self.inventory.cost_this_month()
+        except (sqlite3.Error, OSError) as e:
+            messagebox.showerror("Error", f"Failed to read the inventory: {str(e)}")
+            return
+        lines = [f"{material}: {remaining:.1f}g on {count} spool{'s' if count != 1 else ''}"
+                 for material, remaining, count in by_material]
+        lines.append("")
+        lines.append(f"Used this month: {grams:.1f}g (${cost:.2f})")
+        messagebox.showinfo("Inventory", "\n".join(lines if by_material else lines[1:]))
+        
     def reset_all(self):
         # Reset basic inputs
         self.power_cost.set("0.15")
@@ -263,22 +540,9 @@ class PrintCostCalculator:
         self.print_time.set("4.5")
         self.num_items.set("1")
         
-        # Remove all spools except the first one
-        while len(self.spool_frames) > 1:
-            self.remove_spool(self.spool_frames[-1]['frame'])
-            
-        # Reset first spool
-        first_spool = self.spool_frames[0]['data']
-        first_spool['name'].set("Spool 1")
-        first_spool['cost'].set("25.00")
-        first_spool['weight'].set("1000")
-        first_spool['used'].set("75")
-        
-        # Clear results
-        self.power_cost_result.set("")
-        self.filament_cost_result.set("")
-        self.total_cost_result.set("")
-        self.cost_per_item_result.set("")
+        # Back to the spools in the inventory
+        self.remove_spools(list(self.spools), retire=False)
+        self.load_inventory()
     
     def save_settings(self):
         file_path = filedialog.asksaveasfilename(
@@ -296,17 +560,10 @@ class PrintCostCalculator:
                 'print_time': self.print_time.get(),
                 'num_items': self.num_items.get()
             },
-            'spools': []
+            'spools': [record.to_settings() for record in self.spools.values()]
         }
         
-        for spool in self.spool_frames:
-            settings['spools'].append({
-                'name': spool['data']['name'].get(),
-                'cost': spool['data']['cost'].get(),
-                'weight': spool['data']['weight'].get(),
-                'used': spool['data']['used'].get()
-            })
-            
+        import json
         with open(file_path, 'w') as f:
             json.dump(settings, f, indent=2)
             
@@ -320,6 +577,7 @@ class PrintCostCalculator:
         if not file_path:
             return
             
+        import json
         try:
             with open(file_path, 'r') as f:
                 settings = json.load(f)
@@ -330,18 +588,21 @@ class PrintCostCalculator:
             self.print_time.set(settings['basic']['print_time'])
             self.num_items.set(settings['basic']['num_items'])
             
-            # Remove existing spools
-            while self.spool_frames:
-                self.remove_spool(self.spool_frames[0]['frame'])
-                
-            # Load spools
-            for spool in settings['spools']:
-                self.create_spool_frame()
-                current_spool = self.spool_frames[-1]['data']
-                current_spool['name'].set(spool['name'])
-                current_spool['cost'].set(spool['cost'])
-                current_spool['weight'].set(spool['weight'])
-                current_spool['used'].set(spool['used'])
+            # Read every spool before replacing the table
+            records = [spools.SpoolRecord.from_settings(next(self.spool_keys), spool)
+                       for spool in settings['spools']]
+            
+            # Spools saved with a link to a still active inventory spool keep
+            # its recorded balance; the others are not inventory stock
+            stock = {spool_id: grams for spool_id, _, _, _, _, grams in self.inventory.spools()}
+            for record in records:
+                if record.spool_id in stock:
+                    record.weight = stock[record.spool_id]
+                else:
+                    record.spool_id = None
+            
+            self.remove_spools(list(self.spools), retire=False)
+            self.insert_spools(records)
                 
             messagebox.showinfo("Success", "Settings loaded successfully!")
             
@@ -352,6 +613,9 @@ class PrintCostCalculator:
         if not self.total_cost_result.get():
             messagebox.showwarning("No Results", "Please calculate results before exporting.")
             return
+        if self.parse_thread is not None:
+            messagebox.showwarning("Busy", "Please wait for the G-code file to finish parsing.")
+            return
             
         file_path = filedialog.asksaveasfilename(
             defaultextension=".txt",
@@ -362,6 +626,12 @@ class PrintCostCalculator:
             return
             
         try:
+            if file_path.lower().endswith('.csv'):
+                if not self.scan_for_breakdown(file_path):
+                    self.export_csv(file_path)
+                    messagebox.showinfo("Success", "Results exported successfully!")
+                return
+
             with open(file_path, 'w') as f:
                 f.write("3D Print Cost Calculator - Results\n")
                 f.write("-" * 40 + "\n\n")
@@ -373,12 +643,13 @@ class PrintCostCalculator:
                 f.write(f"Number of Items: {self.num_items.get()}\n\n")
                 
                 f.write("Filament Spools:\n")
-                for spool in self.spool_frames:
-                    data = spool['data']
-                    f.write(f"{data['name'].get()}:\n")
-                    f.write(f"  Cost: ${data['cost'].get()}\n")
-                    f.write(f"  Weight: {data['weight'].get()}g\n")
-                    f.write(f"  Used: {data['used'].get()}g\n")
+                for record in self.spools.values():
+                    f.write(f"{record.name}:\n")
+                    f.write(f"  Material: {record.material}\n")
+                    f.write(f"  Cost: ${record.cost:.2f}\n")
+                    f.write(f"  Weight: {record.weight:.2f}g\n")
+                    f.write(f"  Used: {record.used:.1f}g\n")
+                    f.write(f"  Print Cost: ${self.cost_model.spool_costs[record.key]:.2f}\n")
                 f.write("\n")
                 
                 f.write("Results:\n")
@@ -392,148 +663,269 @@ class PrintCostCalculator:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export results: {str(e)}")
 
+    def export_csv(self, file_path):
+        """Write the totals, and the loaded G-code's per-feature and per-layer costs, as CSV."""
+        totals = self.cost_model.totals()
+        with open(file_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['plate', 'kind', 'name', 'filament_mm', 'filament_grams', 'print_hours', 'cost'])
+            writer.writerow(['', 'power', '', '', '', self.print_time.get(), f"{totals['power_cost']:.4f}"])
+            for record in self.spools.values():
+                writer.writerow(['', 'spool', record.name, '', f"{record.used:.1f}", '',
+                                 f"{totals['spool_costs'][record.key]:.4f}"])
+            writer.writerow(['', 'total', '', '', '', self.print_time.get(), f"{totals['total_cost']:.4f}"])
+
+            result = self.gcode_result
+            if result is None or not result.has_breakdown():
+                return
+            factors = [record.mm_per_gram for record in self.spools.values()]
+            for plate, kind, name, mm, grams, seconds, cost in result.breakdown(factors, totals['total_cost']):
+                writer.writerow([Path(plate).stem if plate else '', kind, name, f"{mm:.2f}", f"{grams:.2f}",
+                                 '' if seconds is None else f"{seconds / 3600:.4f}", f"{cost:.4f}"])
+
+    def scan_for_breakdown(self, file_path):
+        """Start the scan a CSV export of the loaded G-code needs; returns whether it was started.
+
+        Loads read the slicer summary when it is complete and skip the scan
+        that fills the layer and feature buckets, so it runs on the first CSV
+        export, in the background like a load, and the CSV is written when it
+        finishes.
+        """
+        if self.gcode_result is None or self.gcode_file is None or self.gcode_result.has_breakdown():
+            return False
+        result = None
+        if self.parse_cache is not None:
+            try:
+                result = self.parse_cache.get(self.gcode_file)
+            except (sqlite3.Error, OSError):
+                pass
+        if result is not None and result.has_breakdown():
+            self.gcode_result = result
+            return False
+        self.parse_export = file_path
+        self.start_gcode_parse(self.gcode_file, self.start_profile("export_breakdown", file=self.gcode_file),
+                               breakdown=True)
+        return True
+
+    def start_profile(self, name, **details):
+        """A profiling.Profile for an operation, or None when profiling is off."""
+        if not self.profiling:
+            return None
+        return profiling.Profile(name, **details)
+
+    def finish_profile(self, profile, status="ok"):
+        if profile is None:
+            return
+        profile.finish(status)
+        self.profile_status.set(profile.summary())
+        if self.trace is not None:
+            try:
+                self.trace.write(profile)
+            except OSError:
+                pass  # Losing the trace must not break the app
+
     def load_gcode(self):
-        """Load and parse a G-code file to extract print time and filament usage."""
+        """Load a G-code file and parse it on a background thread."""
+        if self.parse_thread is not None or not self.widgets_ready:
+            return
+
         file_path = filedialog.askopenfilename(
             filetypes=[("G-code Files", "*.gcode *.gcode.3mf")],
             title="Load G-code File"
         )
         if not file_path:
             return
+        self.gcode_file = file_path
+        self.gcode_result = None
+        profile = self.start_profile("load_gcode", file=file_path)
 
+        # Files loaded before come straight from the parse cache
         try:
-            # Check if this is a .gcode.3mf file
-            if file_path.endswith('.gcode.3mf') or file_path.endswith('.3mf'):
-                try:
-                    with zipfile.ZipFile(file_path, 'r') as zip_file:
-                        gcode_files = [f for f in zip_file.namelist() if f.endswith('.gcode')]
-                        if not gcode_files:
-                            messagebox.showerror("Error", "No G-code file found in the 3MF container")
-                            return
-                        with zip_file.open(gcode_files[0]) as f:
-                            raw = f.read()
-                except zipfile.BadZipFile:
-                    messagebox.showerror("Error", "Invalid or corrupted 3MF container")
-                    return
-            else:
-                with open(file_path, 'rb') as f:
-                    raw = f.read()
+            with profiling.phase(profile, 'cache'):
+                if self.parse_cache is None:
+                    import parse_cache
+                    self.parse_cache = parse_cache.ParseCache()
+                result = self.parse_cache.get(file_path)
+        except (sqlite3.Error, OSError):
+            result = None
+        if result is not None:
+            self.apply_gcode_result(result, profile)
+            return
+        self.start_gcode_parse(file_path, profile)
 
-            # Try UTF-8 first, then fall back to Latin-1
-            try:
-                text = raw.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    text = raw.decode('latin-1')
-                except UnicodeDecodeError:
-                    messagebox.showerror("Error", "Could not decode the G-code content.")
-                    return
+    def start_gcode_parse(self, file_path, profile=None, breakdown=False):
+        """Parse on a background thread; poll_gcode_parse picks up the result."""
+        self.parse_cancel = threading.Event()
+        self.parse_queue = queue.Queue()
+        self.parse_profile = profile
+        self.parse_thread = threading.Thread(target=self.parse_gcode_worker,
+                                             args=(file_path, self.parse_queue, self.parse_cancel, profile,
+                                                   breakdown),
+                                             daemon=True)
+        self.parse_progress.set(0)
+        self.parse_status.set("Parsing G-code...")
+        self.progress_frame.grid()
+        self.parse_thread.start()
+        self.root.after(50, self.poll_gcode_parse)
 
-            # Initialize variables
-            self.gcode_time_seconds = None
-            self.gcode_filament_mm = None
-            absolute_e = True
-            current_e = 0.0
-            total_extrusion = 0.0
-            total_moves = 0
-            total_lines = 0
-            g1_lines = 0
+    def parse_gcode_worker(self, file_path, results, cancel, profile=None, breakdown=False):
+        # Runs off the Tk thread: only talk to the UI through the queue; the
+        # profile is not touched by the UI until the parse has finished
+        import gcode_parser
+        
+        def report(done, total):
+            results.put(('progress', done, total))
 
-            # Process the decoded content
-            for line in text.splitlines():
-                total_lines += 1
-                try:
-                    line = line.strip()
-                    if not line or line.startswith(';'):
-                        continue
+        try:
+            result = gcode_parser.parse_file(file_path, progress=report, cancel=cancel,
+                                             workers=os.cpu_count(), breakdown=breakdown, profile=profile)
+            if profile is not None:
+                profile.count('bytes', result.bytes_read)
+                profile.count('lines', result.total_lines)
+            try:
+                with profiling.phase(profile, 'cache'):
+                    self.parse_cache.put(file_path, result)
+            except (sqlite3.Error, OSError):
+                pass  # A cache that cannot be written only costs a reparse
+            results.put(('done', result))
+        except gcode_parser.ParseCancelled:
+            results.put(('cancelled',))
+        except Exception as e:
+            results.put(('error', e))
 
-                    if self.gcode_time_seconds is None:
-                        time_patterns = [
-                            (r';TIME:(\d+)', 1),
-                            (r';Print time: (\d+)', 1),
-                            (r';Estimated printing time: .* (\d+)s', 1),
-                            (r'M73 P\d+ R(\d+)', 60),
-                            (r';TIME_ELAPSED:(\d+\.?\d*)', 1),
-                            (r'; estimated printing time = .* = (\d+)s', 1)
-                        ]
-                        for pattern, multiplier in time_patterns:
-                            time_match = re.search(pattern, line, re.IGNORECASE)
-                            if time_match:
-                                value = float(time_match.group(1))
-                                self.gcode_time_seconds = value * multiplier
-                                break
+    def cancel_gcode_parse(self):
+        if self.parse_cancel is not None:
+            self.parse_cancel.set()
+            self.parse_status.set("Cancelling...")
 
-                    fil_match = re.search(r';Filament used:\s*([\d.]+)\s*mm', line, re.IGNORECASE)
-                    if fil_match:
-                        self.gcode_filament_mm = float(fil_match.group(1))
-                        continue
+    def poll_gcode_parse(self):
+        message = None
+        try:
+            while True:
+                message = self.parse_queue.get_nowait()
+                if message[0] != 'progress':
+                    break
+                done, total = message[1], message[2]
+                if total:
+                    percent = min(done * 100.0 / total, 100.0)
+                    self.parse_progress.set(percent)
+                    self.parse_status.set(f"Parsing G-code... {done / 1e6:.1f} MB ({percent:.0f}%)")
+        except queue.Empty:
+            pass
 
-                    if 'M83' in line:
-                        absolute_e = False
-                        continue
-                    elif 'M82' in line:
-                        absolute_e = True
-                        continue
+        if message is None or message[0] == 'progress':
+            self.root.after(50, self.poll_gcode_parse)
+            return
 
-                    if 'G1' in line:
-                        g1_lines += 1
-                        e_match = re.search(r'(?:^|[^0-9.])[Gg]1.*[Ee]([-+]?\d*\.?\d+)', line)
-                        if e_match:
-                            total_moves += 1
-                            new_e = float(e_match.group(1))
-                            extrusion = new_e - current_e if absolute_e else new_e
-                            if extrusion > 0:
-                                total_extrusion += extrusion
-                            current_e = new_e if absolute_e else current_e + new_e
-                            continue
+        profile = self.parse_profile
+        export = self.parse_export
+        self.parse_thread = None
+        self.parse_cancel = None
+        self.parse_profile = None
+        self.parse_export = None
+        self.progress_frame.grid_remove()
 
-                    if re.search(r'[Gg]92.*[Ee].*0', line):
-                        current_e = 0.0
+        if message[0] == 'done' and export is not None:
+            # Same totals as the loaded result, so the fields are left alone
+            self.gcode_result = message[1]
+            self.finish_profile(profile)
+            try:
+                self.export_csv(export)
+                messagebox.showinfo("Success", "Results exported successfully!")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to export results: {str(e)}")
+        elif message[0] == 'done':
+            self.apply_gcode_result(message[1], profile)
+        elif message[0] == 'error':
+            self.finish_profile(profile, "error")
+            self.show_gcode_error(message[1])
+        else:
+            self.finish_profile(profile, "cancelled")
 
-                except (ValueError, IndexError):
-                    continue
+    def show_gcode_error(self, error):
+        import gcode_parser
+        if isinstance(error, gcode_parser.GCodeError):
+            messagebox.showerror("Error", str(error))
+        elif isinstance(error, FileNotFoundError):
+            messagebox.showerror("Error", "File not found or could not be opened.")
+        elif isinstance(error, PermissionError):
+            messagebox.showerror("Error", "Permission denied while trying to read the file.")
+        else:
+            messagebox.showerror("Error", f"Failed to parse G-code file: {str(error)}")
 
-            # Calculate final values
-            if self.gcode_filament_mm is None or self.gcode_filament_mm <= 0:
-                self.gcode_filament_mm = total_extrusion
+    def apply_gcode_result(self, result, profile=None):
+        """Copy a finished parse into the print time and spool fields."""
+        self.gcode_result = result
+        self.gcode_time_seconds = result.time_seconds
+        self.gcode_filament_mm = result.filament_mm
 
-            # Update UI
+        with profiling.phase(profile, 'ui update'):
+            # Update UI: one spool per tool, T0 on the first spool
+            records = list(self.spools.values())
             if self.gcode_filament_mm > 0:
-                filament_grams = self.gcode_filament_mm / 330
-                if not self.spool_frames:
-                    self.create_spool_frame()
-                self.spool_frames[0]['data']['used'].set(f"{filament_grams:.1f}")
+                for _ in range(len(records), len(result.tool_grams())):
+                    records.append(self.add_spool())
+
+            # Prefer the weight the slicer reported, otherwise convert the length
+            # with the material of each tool's spool
+            factors = [record.mm_per_gram for record in records]
+            filament_grams = result.grams(factors)
+            tool_grams = result.tool_grams(factors)
+            if self.gcode_filament_mm > 0:
+                for record, grams in zip(records, tool_grams):
+                    record.used = round(grams, 1)
+                    self.refresh_spool(record)
 
             if self.gcode_time_seconds is not None:
                 self.print_time.set(f"{self.gcode_time_seconds/3600:.2f}")
 
-            # Show results
-            if self.gcode_time_seconds is None and self.gcode_filament_mm is None:
-                messagebox.showerror(
-                    "Error",
-                    "Could not find print time or filament usage in the G-code file."
-                )
-            else:
-                results = []
-                if self.gcode_time_seconds is not None:
-                    hours = self.gcode_time_seconds // 3600
-                    minutes = (self.gcode_time_seconds % 3600) // 60
-                    results.append(f"Print Time: {int(hours)}h {int(minutes)}m")
-                if self.gcode_filament_mm is not None:
-                    grams = self.gcode_filament_mm / 330
-                    results.append(f"Filament Usage: {grams:.1f}g ({self.gcode_filament_mm:.1f}mm)")
-                messagebox.showinfo("Success", "\n".join(results))
+        # Timed before the dialog, which waits for the user
+        self.finish_profile(profile)
 
-        except FileNotFoundError:
-            messagebox.showerror("Error", "File not found or could not be opened.")
-        except PermissionError:
-            messagebox.showerror("Error", "Permission denied while trying to read the file.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to parse G-code file: {str(e)}")
+        # Show results
+        if self.gcode_time_seconds is None and self.gcode_filament_mm is None:
+            messagebox.showerror(
+                "Error",
+                "Could not find print time or filament usage in the G-code file."
+            )
+        else:
+            results = []
+            if self.gcode_time_seconds is not None:
+                hours = self.gcode_time_seconds // 3600
+                minutes = (self.gcode_time_seconds % 3600) // 60
+                results.append(f"Print Time: {int(hours)}h {int(minutes)}m")
+            if self.gcode_filament_mm is not None:
+                results.append(f"Filament Usage: {filament_grams:.1f}g ({self.gcode_filament_mm:.1f}mm)")
+                if len(tool_grams) > 1:
+                    results.extend(f"  T{tool}: {grams:.1f}g" for tool, grams in enumerate(tool_grams))
+            if result.filament_cost:
+                results.append(f"Slicer Filament Cost: ${result.filament_cost:.2f}")
+            if len(result.plates) > 1:
+                results.append("")
+                for plate in result.plates:
+                    plate_grams = plate.grams(factors)
+                    plate_time = ""
+                    if plate.time_seconds is not None:
+                        plate_time = f"{int(plate.time_seconds // 3600)}h {int(plate.time_seconds % 3600 // 60)}m, "
+                    results.append(f"{Path(plate.name).stem}: {plate_time}{plate_grams:.1f}g")
+            if result.from_metadata:
+                results.append("(read from slicer metadata)")
+            if result.time_estimated:
+                results.append("(print time estimated from the toolpath)")
+            messagebox.showinfo("Success", "\n".join(results))
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="3D print cost calculator")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="write the phase timings of every G-code load and calculation to this JSON file")
+    parser.add_argument('--status-bar', action='store_true',
+                        help="show the timings of the last load or calculation in a status bar")
+    args = parser.parse_args(argv)
 
-def main():
     root = ttk.Window(themename="darkly")
-    app = PrintCostCalculator(root)
+    trace = profiling.Trace(args.profile) if args.profile else None
+    app = PrintCostCalculator(root, trace, args.status_bar)
     root.mainloop()
 
 if __name__ == "__main__":
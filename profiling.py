@@ -0,0 +1,165 @@
+"""Opt-in timings of the slow operations, for diagnosing loads in the field.
+
+An operation (loading a G-code file, a calculate) gets a Profile; the code
+it runs adds the seconds spent in each phase and counts what it processed.
+The G-code phases are:
+
+    metadata   reading the slicer summary comments at the head and tail
+    read       reading the file, which for a .gcode.3mf includes inflating it
+    split      cutting the bytes into lines (nothing is decoded to text); on
+               a memory-mapped file this is also where the pages are read
+    scan       tokenizing the lines for extrusion, tools, layers and features
+    estimate   the motion model, for files without a print time
+    workers    parses run in worker processes, which are timed as a whole
+
+Every hook takes profile=None and costs nothing when profiling is off.
+Finished profiles are written to a Trace, a JSON file rewritten after each
+operation so it survives the app being killed.
+"""
+from contextlib import contextmanager, nullcontext
+import sys
+import time
+
+
+def peak_rss():
+    """Highest resident memory of this process so far, in bytes, or None when unknown.
+
+    Memory of worker processes is not included.
+    """
+    try:
+        import resource
+    except ImportError:
+        return windows_peak_rss()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def windows_peak_rss():
+    try:
+        import ctypes
+        from ctypes import wintypes
+    except ImportError:
+        return None
+
+    class Counters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    try:
+        counters = Counters(cb=ctypes.sizeof(Counters))
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+    except (AttributeError, OSError):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+class Profile:
+    """Phase timings and counters of one operation.
+
+    Phases are accumulated, so a phase entered once per chunk reports its
+    total. Phases of one profile must not overlap, or time is counted twice.
+    """
+
+    def __init__(self, name, **details):
+        self.name = name
+        self.details = details
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.counters = {}
+        self.status = None
+        self.seconds = None
+        self.peak_rss = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, name, iterable):
+        """Yield from iterable, adding the time spent producing each item to a phase."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start)
+                return
+            self.add(name, time.perf_counter() - start)
+            yield item
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self, status="ok"):
+        self.seconds = time.perf_counter() - self.start
+        self.status = status
+        self.peak_rss = peak_rss()
+        return self
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'status': self.status,
+            'started': self.started,
+            'seconds': self.seconds,
+            'phases': self.phases,
+            'counters': self.counters,
+            'peak_rss_mb': None if self.peak_rss is None else self.peak_rss / 1e6,
+            **self.details,
+        }
+
+    def summary(self):
+        """One line for a status bar: total, slowest phases first, then the counters."""
+        text = f"{self.name}: {self.seconds:.2f} s"
+        if self.status != "ok":
+            text += f" ({self.status})"
+        phases = sorted(self.phases.items(), key=lambda item: item[1], reverse=True)
+        if phases:
+            text += " [" + ", ".join(f"{name} {seconds:.2f}" for name, seconds in phases) + "]"
+        if 'lines' in self.counters:
+            text += f" | {self.counters['lines']:,} lines"
+        if 'bytes' in self.counters:
+            text += f" | {self.counters['bytes'] / 1e6:.1f} MB"
+        if self.peak_rss is not None:
+            text += f" | peak {self.peak_rss / 1e6:.0f} MB"
+        return text
+
+
+def phase(profile, name):
+    """profile.phase(name), or a no-op context when profile is None."""
+    return nullcontext() if profile is None else profile.phase(name)
+
+
+class Trace:
+    """JSON file of every finished Profile of a session."""
+
+    def __init__(self, path):
+        # Only loaded when profiling is on, to keep them out of the app's startup
+        import platform
+        self.path = path
+        self.data = {
+            'started': time.time(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'operations': [],
+        }
+
+    def write(self, profile):
+        import json
+        self.data['operations'].append(profile.to_dict())
+        with open(self.path, 'w') as f:
+            json.dump(self.data, f, indent=2)
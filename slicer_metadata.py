@@ -0,0 +1,134 @@
+"""Read slicer summary comments from the head and tail of a G-code file.
+
+PrusaSlicer, Cura, OrcaSlicer, Bambu Studio and Simplify3D all write the
+estimated print time and filament totals as comments in a block at the
+start or the end of the file, so those two blocks are usually enough.
+"""
+import re
+
+# Bytes read from each end of the file
+PROBE_SIZE = 256 << 10
+
+DURATION_PATTERN = re.compile(rb'(\d+(?:\.\d+)?)\s*([dhms])', re.IGNORECASE)
+DURATION_UNITS = {b'd': 86400, b'h': 3600, b'm': 60, b's': 1}
+
+
+def parse_duration(text):
+    """Seconds in a slicer duration such as '1d 2h 3m 4s' or '1 hours 2 minutes'."""
+    total = 0.0
+    found = False
+    for value, unit in DURATION_PATTERN.findall(text):
+        total += float(value) * DURATION_UNITS[unit.lower()]
+        found = True
+    return total if found else None
+
+
+def parse_list(text, scale=1.0):
+    """Per-extruder values written as '1.5, 0.0' (units such as 'm' are stripped)."""
+    values = []
+    for part in text.split(b','):
+        part = part.strip().rstrip(b'mg').strip()
+        if part:
+            values.append(float(part) * scale)
+    return values
+
+
+# (pattern, field, converter); the first group holds the value
+METADATA_KEYS = [
+    # Time
+    (re.compile(rb';TIME:(\d+(?:\.\d+)?)'), 'time_seconds', float),
+    (re.compile(rb'; estimated printing time \(normal mode\) = (.+)'), 'time_seconds', parse_duration),
+    (re.compile(rb'; total estimated time: ([^;]+)'), 'time_seconds', parse_duration),
+    (re.compile(rb';\s*Build time: (.+)', re.IGNORECASE), 'time_seconds', parse_duration),
+    (re.compile(rb';Print time: (\d+)', re.IGNORECASE), 'time_seconds', float),
+    (re.compile(rb';TIME_ELAPSED:(\d+(?:\.\d+)?)'), 'elapsed_seconds', float),
+    # Filament length
+    (re.compile(rb';Filament used:\s*([\d.]+)\s*mm', re.IGNORECASE), 'filament_mm', float),
+    # Cura writes meters per extruder
+    (re.compile(rb';Filament used: ([\d.,\sm]+)m\s*$'), 'extruder_mm', lambda v: parse_list(v, 1000.0)),
+    (re.compile(rb'; filament used \[mm\] = (.+)'), 'extruder_mm', parse_list),
+    (re.compile(rb'; total filament length \[mm\] : ([\d.]+)'), 'filament_mm', float),
+    (re.compile(rb';\s*Filament length: ([\d.]+) mm'), 'filament_mm', float),
+    # Filament weight
+    (re.compile(rb'; filament used \[g\] = (.+)'), 'extruder_g', parse_list),
+    (re.compile(rb'; total filament used \[g\] = ([\d.]+)'), 'filament_g', float),
+    (re.compile(rb'; total filament weight \[g\] : ([\d.]+)'), 'filament_g', float),
+    (re.compile(rb';\s*Plastic weight: ([\d.]+) ?g'), 'filament_g', float),
+    # Filament cost
+    (re.compile(rb'; filament cost = (.+)'), 'extruder_cost', parse_list),
+    (re.compile(rb'; total filament cost = ([\d.]+)'), 'filament_cost', float),
+]
+
+
+class SlicerMetadata:
+    """Values collected from the summary comments of one file."""
+
+    def __init__(self):
+        self.time_seconds = None
+        self.elapsed_seconds = None
+        self.filament_mm = None
+        self.filament_g = None
+        self.filament_cost = None
+        self.extruder_mm = []
+        self.extruder_g = []
+        self.extruder_cost = []
+
+    def read_lines(self, lines):
+        for line in lines:
+            line = line.strip()
+            if not line.startswith(b';'):
+                continue
+            for pattern, field, convert in METADATA_KEYS:
+                match = pattern.search(line)
+                if not match:
+                    continue
+                try:
+                    value = convert(match.group(1))
+                except ValueError:
+                    continue
+                if value is None:
+                    continue
+                if field == 'elapsed_seconds':
+                    # Cura writes the elapsed time per layer, the last one is the total
+                    self.elapsed_seconds = max(self.elapsed_seconds or 0.0, value)
+                elif field.startswith('extruder_') or getattr(self, field) is None:
+                    setattr(self, field, value)
+                break
+
+    def finish(self):
+        if self.time_seconds is None:
+            self.time_seconds = self.elapsed_seconds
+        if self.filament_mm is None and self.extruder_mm:
+            self.filament_mm = sum(self.extruder_mm)
+        if self.filament_g is None and self.extruder_g:
+            self.filament_g = sum(self.extruder_g)
+        if self.filament_cost is None and self.extruder_cost:
+            self.filament_cost = sum(self.extruder_cost)
+        return self
+
+    @property
+    def complete(self):
+        return self.time_seconds is not None and bool(self.filament_mm)
+
+
+def probe_stream(stream, size, probe_size=PROBE_SIZE, tail=None):
+    """Read the head and tail of a seekable binary stream and parse their comments.
+
+    tail is the last probe_size bytes when the caller already has them, or
+    False to read the head only: seeking in a compressed stream inflates
+    everything before the tail.
+    """
+    metadata = SlicerMetadata()
+    if size <= 2 * probe_size:
+        metadata.read_lines(stream.read().split(b'\n'))
+        return metadata.finish()
+
+    head = stream.read(probe_size)
+    # Drop the line cut in half at the end of the block
+    metadata.read_lines(head[:head.rfind(b'\n')].split(b'\n'))
+    if tail is None:
+        stream.seek(size - probe_size)
+        tail = stream.read()
+    if tail:
+        metadata.read_lines(tail[tail.find(b'\n') + 1:].split(b'\n'))
+    return metadata.finish()
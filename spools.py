@@ -0,0 +1,58 @@
+"""Rows of the desktop app's spool table.
+
+A farm can have hundreds of spools, so each one is a small __slots__ record
+rather than a set of Tk variables and widgets. The table only holds the
+formatted text of each row; the numbers live here.
+"""
+import materials
+
+COLUMNS = ('name', 'material', 'cost', 'weight', 'used', 'print_cost')
+NUMBER_COLUMNS = ('cost', 'weight', 'used')
+
+
+class SpoolRecord:
+    __slots__ = ('key', 'spool_id', 'name', 'material', 'cost', 'weight', 'used')
+
+    def __init__(self, key, name, material=materials.DEFAULT_MATERIAL, cost=25.0,
+                 weight=1000.0, used=75.0, spool_id=None):
+        self.key = key
+        # Links the record to its inventory spool once it has one
+        self.spool_id = spool_id
+        self.name = name
+        self.material = material
+        self.cost = cost
+        self.weight = weight
+        self.used = used
+
+    @property
+    def spool_weight(self):
+        """Net grams on a full spool of this material."""
+        return materials.get_material(self.material).spool_weight
+
+    @property
+    def mm_per_gram(self):
+        return materials.get_material(self.material).mm_per_gram
+
+    def row(self, print_cost=None):
+        """Display values for the table, in COLUMNS order."""
+        return (self.name, self.material, f"{self.cost:.2f}", f"{self.weight:.2f}", f"{self.used:.1f}",
+                "" if print_cost is None else f"{print_cost:.2f}")
+
+    def to_settings(self):
+        """The settings-file entry, with numbers as text like earlier versions wrote."""
+        settings = {
+            'name': self.name,
+            'cost': f"{self.cost:.2f}",
+            'weight': f"{self.weight:.2f}",
+            'used': f"{self.used:.1f}",
+            'material': self.material,
+        }
+        if self.spool_id is not None:
+            settings['spool_id'] = self.spool_id
+        return settings
+
+    @classmethod
+    def from_settings(cls, key, data):
+        """Build a record from a settings-file entry; raises ValueError on bad numbers."""
+        return cls(key, data['name'], data.get('material', materials.DEFAULT_MATERIAL),
+                   float(data['cost']), float(data['weight']), float(data['used']), data.get('spool_id'))
@@ -0,0 +1,69 @@
+import sqlite3
+import sys
+
+import pytest
+
+import batch_cost
+import gcode_parser
+import parse_cache
+
+GCODE = "M83\nG1 X10 E2.5\nG1 X20 E1.5\n"
+
+
+@pytest.fixture
+def gcode_file(tmp_path):
+    path = tmp_path / "part.gcode"
+    path.write_text(GCODE)
+    return str(path)
+
+
+@pytest.mark.skipif(sys.platform in ('win32', 'darwin'), reason="config dir from XDG_CONFIG_HOME")
+def test_unusable_config_dir_falls_back_to_parsing(tmp_path, gcode_file, monkeypatch):
+    not_a_dir = tmp_path / "config"
+    not_a_dir.write_text("")
+    monkeypatch.setenv('XDG_CONFIG_HOME', str(not_a_dir / "sub"))
+
+    result = batch_cost.parse_job(gcode_file)
+    assert result.total_extrusion == 4.0
+
+
+def test_failed_write_back_keeps_the_result(tmp_path, gcode_file, monkeypatch):
+    calls = []
+    parse_file = gcode_parser.parse_file
+
+    def counting_parse(*args, **kwargs):
+        calls.append(args)
+        return parse_file(*args, **kwargs)
+
+    def failing_put(self, *args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(gcode_parser, 'parse_file', counting_parse)
+    monkeypatch.setattr(parse_cache.ParseCache, 'put', failing_put)
+    cache = parse_cache.ParseCache(path=str(tmp_path / "cache.sqlite3"))
+
+    result = parse_cache.cached_parse(gcode_file, cache=cache)
+    assert result.total_extrusion == 4.0
+    assert len(calls) == 1
+
+
+def test_cache_hit_skips_the_parse(tmp_path, gcode_file, monkeypatch):
+    cache = parse_cache.ParseCache(path=str(tmp_path / "cache.sqlite3"))
+    first = parse_cache.cached_parse(gcode_file, cache=cache)
+    monkeypatch.setattr(gcode_parser, 'parse_file', None)
+    assert parse_cache.cached_parse(gcode_file, cache=cache) == first
+
+
+def test_breakdown_scans_a_file_loaded_from_its_summary(tmp_path):
+    from synthetic import write_flavored_gcode
+    path = str(tmp_path / "prusa.gcode")
+    golden = write_flavored_gcode(path, 2000, header='prusa')
+    cache = parse_cache.ParseCache(path=str(tmp_path / "cache.sqlite3"))
+
+    summary = parse_cache.cached_parse(path, cache=cache)
+    assert summary.from_metadata and not summary.has_breakdown()
+
+    result = parse_cache.cached_parse(path, cache=cache, breakdown=True)
+    assert result.layer_extrusion == golden['layer_extrusion']
+    assert result.filament_g == summary.filament_g
+    assert cache.get(path).has_breakdown()
@@ -0,0 +1,34 @@
+import batch_cost
+import cost_engine
+import gcode_parser
+
+
+def test_read_jobs_csv_keeps_project_totals(tmp_path):
+    path = tmp_path / "costs.csv"
+    plates = [gcode_parser.ParseResult(time_seconds=3600.0, filament_mm=3350.0, name=f"Metadata/plate_{i}.gcode")
+              for i in (1, 2)]
+    project = gcode_parser.ParseResult(time_seconds=7200.0, filament_mm=6700.0, plates=plates)
+    plate = gcode_parser.ParseResult(time_seconds=3600.0, filament_mm=3350.0)
+    settings = batch_cost.settings_from_dict({
+        'basic': {'power_cost': '0.15', 'power_usage': '120', 'print_time': '1', 'num_items': '1'},
+        'spools': [{'name': 'Spool 1', 'cost': '25', 'weight': '1000', 'used': '0'}],
+    })
+    rows = [batch_cost.cost_rows('project.gcode.3mf', project, settings),
+            batch_cost.cost_rows('part.gcode', plate, settings),
+            [{'file': 'broken.gcode', 'error': "Invalid or corrupted 3MF container"}]]
+    with open(path, 'w', newline='') as f:
+        batch_cost.write_rows(rows, f, 'csv')
+
+    jobs, names = cost_engine.read_jobs_csv(str(path))
+    assert names == ['project.gcode.3mf', 'part.gcode']
+    assert [hours for hours, _ in jobs] == [2.0, 1.0]
+    assert jobs[0][1] == 2 * jobs[1][1]
+
+
+def test_job_cost_matches_model():
+    model = cost_engine.CostModel(rate=0.2, power_usage=100.0, print_time=5.0, num_items=2)
+    model.set_spool('a', 25.0, 200.0)
+    expected = cost_engine.job_cost(0.2, 100.0, 5.0, 2, [(25.0, 200.0)])
+    totals = model.totals()
+    assert totals['total_cost'] == expected['total_cost']
+    assert totals['cost_per_item'] == expected['cost_per_item']
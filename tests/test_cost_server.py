@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+
+import pytest
+
+import batch_cost
+import cost_server
+
+GCODE = "M83\nG1 X10 E2.5\nG1 X20 E1.5\n"
+
+
+async def exchange(port, request):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request.encode('latin-1'))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    status_line, *lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines)
+    return int(status_line.split()[1]), headers, body
+
+
+def call(server, request):
+    """Answer one request; the worker pool is only started when a test needs it."""
+    async def run():
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        try:
+            return await exchange(listener.sockets[0].getsockname()[1], request)
+        finally:
+            listener.close()
+    return asyncio.run(run())
+
+
+def settings():
+    return batch_cost.settings_from_dict(cost_server.DEFAULT_SETTINGS)
+
+
+PREFLIGHT = "OPTIONS /quote HTTP/1.1\r\nOrigin: https://example.com\r\nConnection: close\r\n\r\n"
+HEALTH = "GET /health HTTP/1.1\r\nConnection: close\r\n\r\n"
+
+
+def test_no_cors_headers_by_default():
+    server = cost_server.CostServer(settings(), workers=1)
+    status, headers, _ = call(server, HEALTH)
+    assert status == 200
+    assert not [name for name in headers if name.startswith('Access-Control-')]
+    assert call(server, PREFLIGHT)[0] == 405
+
+
+def test_configured_origin_gets_cors_and_private_network():
+    server = cost_server.CostServer(settings(), workers=1, allow_origin="http://localhost:8000")
+    status, headers, _ = call(server, PREFLIGHT)
+    assert status == 204
+    assert headers['Access-Control-Allow-Origin'] == "http://localhost:8000"
+    assert headers['Access-Control-Allow-Private-Network'] == "true"
+
+
+def test_any_origin_never_gets_private_network():
+    server = cost_server.CostServer(settings(), workers=1, allow_origin="*")
+    _, headers, _ = call(server, HEALTH)
+    assert headers['Access-Control-Allow-Origin'] == "*"
+    assert 'Access-Control-Allow-Private-Network' not in headers
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="kills a worker with SIGKILL")
+def test_pool_is_replaced_after_a_worker_dies(tmp_path):
+    (tmp_path / "part.gcode").write_text(GCODE)
+    body = json.dumps({'path': str(tmp_path / "part.gcode")})
+    quote = f"POST /quote HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n{body}"
+
+    async def run():
+        server = cost_server.CostServer(settings(), workers=1, allow_dirs=[str(tmp_path)])
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            broken = server.batcher.executor
+            os.kill(broken.submit(os.getpid).result(), signal.SIGKILL)
+            # Fails only when the death is noticed after the job was handed to the pool
+            assert (await exchange(port, quote))[0] in (200, 500)
+            assert server.batcher.executor is not broken
+            return await exchange(port, quote)
+        finally:
+            server.close()
+
+    status, _, body = asyncio.run(run())
+    assert status == 200
+    assert b'"rows"' in body
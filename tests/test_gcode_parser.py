@@ -0,0 +1,76 @@
+import gcode_parser
+
+
+def scan(text):
+    parser = gcode_parser.GCodeParser()
+    parser.feed(text.encode())
+    return parser.finish()
+
+
+def test_lowercase_lines():
+    result = scan("m83\ng1 x10 e1.5\ng92 e0\ng1 x20 e0.5\n")
+    assert result.total_extrusion == 2.0
+    assert result.g1_lines == 2
+
+
+def test_mixed_case_e_word():
+    assert scan("M83\nG1 X10 e1.25\nG92 e0\n").total_extrusion == 1.25
+
+
+def test_line_numbers_and_checksums():
+    result = scan("N1 M82*30\nN2 G92 E0*12\nN3 G1 X10 E2.5*71\nN4 G1 X20 E4.0*8\nN5 T1*4\nN6 G1 X5 E5*3\n")
+    assert result.total_extrusion == 5.0
+    assert result.tool_extrusion == [4.0, 1.0]
+
+
+def test_g0_extrudes_like_g1():
+    result = scan("M83\nG0 X10 E1\nG1 X20 E2\n")
+    assert result.total_extrusion == 3.0
+    assert result.total_moves == 2
+    assert result.g1_lines == 1
+
+
+def test_mode_switches_after_line_numbers():
+    buffer = b"N1 m83*2\nG1 E1\nN20 M82\nM830\n;M83\n"
+    assert gcode_parser.find_mode_switches(buffer) == [(3, False), (19, True)]
+
+
+def test_parallel_matches_serial_on_numbered_lines(tmp_path):
+    lines = []
+    for i in range(20000):
+        if i % 5000 == 0:
+            lines.append(f"N{i} {'m83' if i % 10000 else 'M82'}*1")
+            lines.append("G92 E0")
+            e = 0.0
+        e += 0.1
+        lines.append(f"N{i} G1 X{i % 200} E{0.1 if i % 10000 >= 5000 else e:.5f}*{i % 97}")
+    path = tmp_path / "numbered.gcode"
+    path.write_text("\n".join(lines) + "\n")
+
+    serial = gcode_parser.scan_file(str(path))
+    parallel = gcode_parser.parse_file_parallel(str(path), workers=3)
+    assert serial.total_extrusion > 1900
+    assert parallel.total_extrusion == serial.total_extrusion
+
+
+def test_e_word_followed_by_another_word():
+    assert scan("M83\nG1X10E1.5F1800\n").total_extrusion == 1.5
+    assert scan("M83\nG1 E1.5F1800\n").total_extrusion == 1.5
+    assert scan("M83\nG1\tX10\tE1.5\tF1800\n").total_extrusion == 1.5
+    assert scan("M82\nG92E2F0\nG1 X10 E3.5F1800\n").total_extrusion == 1.5
+
+
+def test_3mf_member_tail_is_read_by_the_scan(tmp_path, monkeypatch):
+    import zipfile
+    from synthetic import write_gcode_3mf
+    path = str(tmp_path / "project.gcode.3mf")
+    # Members well over twice slicer_metadata.PROBE_SIZE, so head and tail are probed apart
+    golden = write_gcode_3mf(path, 40000, header='orca', e_mode='relative')
+
+    def no_seek(self, *args):
+        raise AssertionError("seeking in a 3MF member inflates it")
+
+    monkeypatch.setattr(zipfile.ZipExtFile, 'seek', no_seek)
+    result = gcode_parser.parse_file(path, estimate=False)
+    for field in ('time_seconds', 'filament_mm', 'filament_g', 'from_metadata'):
+        assert getattr(result, field) == golden[field]
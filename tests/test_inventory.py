@@ -0,0 +1,44 @@
+import pytest
+
+import inventory
+
+
+@pytest.fixture
+def stock(tmp_path):
+    return inventory.Inventory(str(tmp_path / "inventory.sqlite3"))
+
+
+def test_record_print_never_links_by_name(stock):
+    old = stock.add_spool("Spool 1", "PLA", 25.0, 1000.0)
+    stock.deduct([(old, 400.0)])
+
+    # A fresh "Spool 1" row, e.g. after Reset All, has no spool_id
+    ids, balances = stock.record_print([(None, "Spool 1", "PLA", 25.0, 1000.0, 1000.0, 50.0)])
+    assert ids[0] != old
+    assert balances[old] == 600.0
+    assert balances[ids[0]] == 950.0
+    assert [kind for _, _, kind, _, _, _ in stock.history(spool_id=old)] == ['deduct', 'load']
+
+
+def test_record_print_updates_and_corrects_linked_spools(stock):
+    spool_id = stock.add_spool("Spool 1", "PLA", 25.0, 1000.0)
+    ids, balances = stock.record_print([(spool_id, "Black PLA", "PLA", 22.0, 1000.0, 800.0, 100.0)], job="part")
+    assert ids == [spool_id]
+    assert balances[spool_id] == 700.0
+    assert stock.spools()[0][1:4] == ("Black PLA", "PLA", 22.0)
+    kinds = [kind for _, _, kind, _, _, _ in stock.history(spool_id=spool_id)]
+    assert kinds == ['deduct', 'adjust', 'load']
+
+
+def test_record_print_is_one_transaction(stock):
+    first = stock.add_spool("Spool 1", "PLA", 25.0, 1000.0)
+    second = stock.add_spool("Spool 2", "PLA", 25.0, 100.0)
+    spools = [(first, "Spool 1", "PLA", 25.0, 1000.0, 900.0, 10.0),
+              (None, "Spool 3", "PETG", 30.0, 1000.0, 500.0, 10.0),
+              (second, "Spool 2", "PLA", 25.0, 1000.0, 50.0, 80.0)]
+    with pytest.raises(inventory.InventoryError):
+        stock.record_print(spools)
+
+    assert stock.balance(first) == 1000.0
+    assert [row[0] for row in stock.spools()] == [first, second]
+    assert len(stock.history()) == 2
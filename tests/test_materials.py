@@ -0,0 +1,31 @@
+import math
+
+import pytest
+
+import materials
+
+
+def test_lookup_by_name():
+    petg = materials.get_material("PETG")
+    assert petg.name == "PETG"
+    assert petg.density == 1.27
+
+
+@pytest.mark.parametrize('name', ["Unobtainium", "", None, "pla"])
+def test_unknown_names_fall_back_to_pla(name):
+    assert materials.get_material(name) is materials.MATERIALS[materials.DEFAULT_MATERIAL]
+
+
+def test_conversion_factors():
+    pla = materials.get_material("PLA")
+    # 1 m of 1.75 mm PLA weighs about 2.98 g
+    assert pla.grams_per_mm * 1000 == pytest.approx(2.982, abs=0.001)
+    assert pla.mm_per_gram * pla.grams_per_mm == pytest.approx(1.0)
+    thick = materials.get_material("PLA 2.85mm")
+    assert thick.grams_per_mm / pla.grams_per_mm == pytest.approx((2.85 / 1.75) ** 2)
+
+
+def test_spool_cost():
+    assert materials.get_material("PLA").spool_cost == 25.0
+    assert materials.get_material("TPU").spool_cost == 25.0
+    assert all(math.isfinite(material.mm_per_gram) for material in materials.MATERIALS.values())
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+import bench_motion
+import gcode_parser
+import motion_model
+
+PLANNERS = [pytest.param(True, id='numpy', marks=pytest.mark.skipif(motion_model.np is None,
+                                                                     reason="needs numpy")),
+            pytest.param(False, id='python')]
+
+
+def estimate(text, vectorized=False, batch_size=motion_model.BATCH_SIZE):
+    estimator = motion_model.MotionEstimator(batch_size=batch_size, vectorized=vectorized)
+    estimator.feed(text.encode())
+    return estimator.finish()
+
+
+@pytest.mark.parametrize('vectorized', PLANNERS)
+@pytest.mark.parametrize('batch_size', [motion_model.BATCH_SIZE, 7])
+def test_reversals_match_the_golden_time(vectorized, batch_size):
+    moves = 1000
+    golden = moves * (bench_motion.SEGMENT / bench_motion.SPEED + bench_motion.SPEED / bench_motion.ACCELERATION)
+    estimator = motion_model.MotionEstimator(batch_size=batch_size, vectorized=vectorized)
+    estimator.feed_lines(bench_motion.synthetic_lines(moves))
+    assert estimator.finish() == pytest.approx(golden, rel=1e-9)
+
+
+def random_toolpath(moves, seed=1):
+    rng = random.Random(seed)
+    lines = ["M204 P1500 T3000 R800", "M205 J0.02", "G1 F3000"]
+    for _ in range(moves):
+        kind = rng.random()
+        x, y = rng.uniform(0, 200), rng.uniform(0, 200)
+        if kind < 0.05:
+            lines.append(f"G1 Z{rng.uniform(0, 50):.2f} F600")
+        elif kind < 0.1:
+            lines.append("G1 E-0.8 F2400" if rng.random() < 0.5 else "G1 E0.8")
+        elif kind < 0.15:
+            lines.append(f"G2 X{x:.3f} Y{y:.3f} I5 J5 E0.5")
+        elif kind < 0.3:
+            lines.append(f"G0 X{x:.3f} Y{y:.3f} F{rng.randint(3000, 12000)}")
+        else:
+            lines.append(f"G1 X{x:.3f} Y{y:.3f} E{rng.uniform(0.01, 1):.4f} F{rng.randint(600, 6000)}")
+    return "M83\n" + "\n".join(lines) + "\n"
+
+
+@pytest.mark.skipif(motion_model.np is None, reason="needs numpy")
+def test_numpy_and_python_planners_agree():
+    text = random_toolpath(3000)
+    expected = estimate(text, vectorized=False, batch_size=100)
+    assert estimate(text, vectorized=True, batch_size=100) == pytest.approx(expected, rel=1e-9)
+    assert estimate(text, vectorized=True) == pytest.approx(expected, rel=1e-9)
+
+
+# One 100 mm move at 100 mm/s from rest to rest takes d/v + v/a
+@pytest.mark.parametrize('text, seconds', [
+    ("M204 S500\nG1 X100 E1 F6000\n", 100 / 100 + 100 / 500),
+    # P sets extruding moves, T travel moves
+    ("M204 P500 T2000\nG1 X100 E1 F6000\n", 100 / 100 + 100 / 500),
+    ("M204 P500 T2000\nG1 X100 F6000\n", 100 / 100 + 100 / 2000),
+    # G91 makes the second move continue in a straight line
+    ("G91\nG1 X100 F6000\nG1 X100\n", 200 / 100 + 100 / 1250),
+    # G92 moves the origin, so X0 is 100 mm away
+    ("G92 X100\nG1 X0 F6000\n", 100 / 100 + 100 / 1250),
+    ("G4 P500\nG4 S2\n", 2.5),
+])
+def test_commands(text, seconds):
+    assert estimate(text) == pytest.approx(seconds)
+
+
+def test_junction_deviation_sets_the_corner_speed():
+    corner = "G1 X100 F6000\nG1 Y100\n"
+    # A tiny deviation stops at the corner, a huge one keeps full speed
+    assert estimate("M205 J0.000001\n" + corner) == pytest.approx(2 * (1 + 100 / 1250), rel=1e-3)
+    assert estimate("M205 J1000\n" + corner) == pytest.approx(2 + 100 / 1250)
+    # Classic jerk is converted to a deviation of 0.4 jerk^2 / a
+    assert estimate("M205 X10\n" + corner) == pytest.approx(estimate("M205 J0.032\n" + corner))
+
+
+def test_parse_member_marks_estimated_times(tmp_path):
+    path = tmp_path / "part.gcode"
+    path.write_text("M83\nG1 X100 E1 F6000\n")
+    result = gcode_parser.parse_file(str(path))
+    assert result.time_estimated
+    assert result.time_seconds == pytest.approx(1 + 100 / 1250)
+    assert gcode_parser.parse_file(str(path), estimate=False).time_seconds is None
+
+    path.write_text("M73 P0 R7\nM83\nG1 X100 E1 F6000\n")
+    result = gcode_parser.parse_file(str(path))
+    assert not result.time_estimated
+    assert result.time_seconds == 7 * 60
@@ -0,0 +1,29 @@
+"""Parser regressions: every synthetic case parses to its golden values.
+
+The same checks as benchmarks/bench_parser.py, run by pytest on small files.
+"""
+import pytest
+
+import bench_parser
+
+LINES = 20_000
+
+
+@pytest.fixture(params=sorted(bench_parser.CASES))
+def case(request, tmp_path):
+    return bench_parser.write_case(str(tmp_path), request.param, LINES)
+
+
+def test_golden_values(case):
+    file_path, golden = case
+    assert bench_parser.check_case(file_path, golden) == []
+
+
+def test_peak_memory(case):
+    file_path, golden = case
+    assert bench_parser.peak_memory(file_path, golden) / 1e6 < bench_parser.MAX_PEAK_MB
+
+
+def test_scan_benchmark(benchmark, case):
+    file_path, golden = case
+    benchmark(bench_parser.scan_all, file_path, golden)
@@ -0,0 +1,57 @@
+import json
+
+import profiling
+
+
+def test_phases_accumulate_and_counters_add_up():
+    profile = profiling.Profile("load_gcode", file="part.gcode")
+    for _ in range(3):
+        with profile.phase('scan'):
+            pass
+    profile.add('read', 0.25)
+    profile.add('read', 0.5)
+    assert list(profile.timed('split', [1, 2, 3])) == [1, 2, 3]
+    profile.count('lines', 10)
+    profile.count('lines', 5)
+    profile.finish()
+
+    assert profile.phases['read'] == 0.75
+    assert set(profile.phases) == {'scan', 'read', 'split'}
+    assert profile.counters == {'lines': 15}
+    assert profile.seconds >= 0
+    assert "load_gcode:" in profile.summary()
+    assert "15 lines" in profile.summary()
+    assert "(error)" in profiling.Profile("calculate").finish("error").summary()
+
+
+def test_phase_without_a_profile_is_a_no_op():
+    with profiling.phase(None, 'scan'):
+        pass
+
+
+def test_peak_rss():
+    peak = profiling.peak_rss()
+    assert peak is None or peak > 1 << 20
+
+
+def test_trace_file_format(tmp_path):
+    path = tmp_path / "trace.json"
+    trace = profiling.Trace(str(path))
+    first = profiling.Profile("load_gcode", file="part.gcode")
+    first.add('scan', 1.5)
+    first.count('bytes', 2_000_000)
+    trace.write(first.finish())
+    trace.write(profiling.Profile("calculate", spools=2).finish("error"))
+
+    data = json.loads(path.read_text())
+    assert set(data) == {'started', 'python', 'platform', 'operations'}
+    load, calculate = data['operations']
+    assert load['name'] == "load_gcode"
+    assert load['file'] == "part.gcode"
+    assert load['status'] == "ok"
+    assert load['phases'] == {'scan': 1.5}
+    assert load['counters'] == {'bytes': 2_000_000}
+    assert set(load) >= {'started', 'seconds', 'peak_rss_mb'}
+    assert calculate['status'] == "error"
+    assert calculate['spools'] == 2
+
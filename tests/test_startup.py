@@ -0,0 +1,40 @@
+"""Startup regressions: the app's own imports stay light and defer the parser.
+
+The same checks as benchmarks/bench_startup.py, run by pytest.
+"""
+import importlib.util
+import os
+
+import pytest
+
+import bench_startup
+
+MODULES = bench_startup.app_imports()
+
+
+def test_parser_and_workers_are_not_imported_at_startup():
+    _, cumulative = bench_startup.import_profile(MODULES)
+    assert [name for name in bench_startup.DEFERRED_MODULES if name in cumulative] == []
+
+
+def test_app_import_time():
+    # Best of three, so a busy machine does not fail the check
+    total = min(bench_startup.import_profile(MODULES)[0] for _ in range(3))
+    assert total < bench_startup.MAX_IMPORT_MS
+
+
+def test_app_modules_add_little_to_the_imports():
+    assert min(bench_startup.import_ratio(MODULES) for _ in range(3)) < bench_startup.MAX_IMPORT_RATIO
+
+
+@pytest.mark.skipif(importlib.util.find_spec('ttkbootstrap') is None or
+                    (os.name == 'posix' and not os.environ.get('DISPLAY')),
+                    reason="needs ttkbootstrap and a display")
+def test_first_paint():
+    times, error = bench_startup.first_paint()
+    assert error is None
+    assert times.get('first_paint', times['ready']) * 1000 < bench_startup.MAX_PAINT_MS
+
+
+def test_import_time_benchmark(benchmark):
+    benchmark(bench_startup.import_profile, MODULES)